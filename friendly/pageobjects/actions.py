@@ -0,0 +1,62 @@
+import logging
+from friendly.pageobjects import scripts
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedActionChains(object):
+    """
+    Queues user actions and performs all of them with one script.
+
+    Supports the most common actions of C{ActionChains}, replayed as
+    synthetic DOM events: unlike native actions they don't move the
+    mouse and typing doesn't fire key events, only input and change
+    events. Use C{ActionChains} for actions relying on real input.
+
+    @type driver: WebDriver
+    """
+    def __init__(self, driver):
+        self._driver = driver
+        self._actions = []
+        self._element = None
+
+    def _queue(self, action, element, data=None):
+        element = element if element is not None else self._element
+        if element is None:
+            raise ValueError('{0} requires an element'.format(action))
+        self._actions.append([action, element, data])
+        return self
+
+    def move_to_element(self, to_element):
+        self._element = to_element
+        return self._queue('move', to_element)
+
+    def click(self, on_element=None):
+        return self._queue('click', on_element)
+
+    def double_click(self, on_element=None):
+        return self._queue('double_click', on_element)
+
+    def context_click(self, on_element=None):
+        return self._queue('context_click', on_element)
+
+    def send_keys_to_element(self, element, *keys_to_send):
+        keys = u''.join(keys_to_send)
+        if any(u'\ue000' <= key <= u'\uf8ff' for key in keys):
+            raise ValueError('Special keys require native ActionChains')
+        return self._queue('keys', element, keys)
+
+    def send_keys(self, *keys_to_send):
+        """
+        Types into the element moved to last.
+        """
+        return self.send_keys_to_element(None, *keys_to_send)
+
+    def perform(self):
+        """
+        Performs the queued actions.
+        """
+        if self._actions:
+            logger.debug('Performing %d actions', len(self._actions))
+            self._driver.execute_script(scripts.ACTIONS, self._actions)
+            self._actions = []
@@ -0,0 +1,107 @@
+import os
+import re
+import json
+import time
+import base64
+import logging
+import zipfile
+import datetime
+import tempfile
+from selenium.common.exceptions import WebDriverException
+from friendly.pageobjects import scripts
+from friendly.pageobjects.driver import CommandTracker
+from friendly.pageobjects.worker import BackgroundWorker
+from friendly.pageobjects.settings import lazy
+
+logger = logging.getLogger(__name__)
+
+
+class FailureArtifacts(object):
+    """
+    Captures the state of the browser after a failure into a zip bundle.
+
+    A bundle contains the screenshot, the page source and an C{info.json}
+    with the URL, title, browser console log and the last commands sent
+    to the driver. Only the capture blocks: URL, title and source are
+    read with one script, compressing and writing the bundle happen on a
+    background thread, so the driver can be reused right away.
+
+    @type directory: str
+    @param directory: Directory to write the bundles to
+    @type worker: BackgroundWorker
+    @param worker: Worker to write with, defaults to a new one
+    """
+    def __init__(self, directory, worker=None):
+        self.directory = directory
+        self._worker = worker if worker else BackgroundWorker('failure-artifacts')
+
+    def capture(self, driver, name, **metadata):
+        """
+        Captures the state of the browser.
+
+        Parts that can't be captured are left out of the bundle.
+
+        @type driver: WebDriver
+        @type name: str
+        @param name: Name of the failure, e.g. the test's
+        @param metadata: Additional information to store in the bundle
+        @return Task resolving to the path of the bundle
+        """
+        tracker = CommandTracker.for_driver(driver)
+        commands = list(tracker.history)
+
+        state, screenshot, console = {}, None, None
+        try:
+            with tracker.readonly():
+                state = driver.execute_script(scripts.PAGE_STATE) or {}
+        except WebDriverException:
+            logger.warn('Could not read the page state of %s', name)
+        try:
+            screenshot = driver.get_screenshot_as_base64()
+        except WebDriverException:
+            logger.warn('Could not take a screenshot of %s', name)
+        try:
+            console = driver.get_log('browser')
+        except WebDriverException:
+            logger.debug('Browser log not supported')
+
+        info = dict(metadata, name=name, time=time.time(), url=state.get('url'), title=state.get('title'),
+                    console=console, commands=commands)
+        return self._worker.submit(self._write, name, info, state.get('source'), screenshot)
+
+    def _filename(self, name):
+        timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        return '{0}_{1}.zip'.format(timestamp, re.sub(r'[^\w.-]+', '_', name)[:100])
+
+    def _write(self, name, info, source, screenshot):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        path = os.path.join(self.directory, self._filename(name))
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            bundle = zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED)
+            bundle.writestr('info.json', json.dumps(info, indent=2, default=repr))
+            if source is not None:
+                bundle.writestr('source.html', source.encode('utf-8'))
+            if screenshot is not None:
+                # PNG data is compressed already
+                bundle.writestr(zipfile.ZipInfo('screenshot.png'), base64.b64decode(screenshot))
+            bundle.close()
+        os.rename(tmp_path, path)
+
+        logger.info('Stored failure artifacts of %s in %s', name, path)
+        return path
+
+    def flush(self):
+        """
+        Waits until all bundles are written.
+        """
+        self._worker.flush()
+
+
+def _create_failure_artifacts():
+    from friendly.pageobjects.settings import settings
+    return FailureArtifacts(settings.get('selenium.failure_artifacts.path', './failures'))
+
+get_failure_artifacts = lazy(_create_failure_artifacts, FailureArtifacts.flush)
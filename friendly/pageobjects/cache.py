@@ -0,0 +1,94 @@
+import json
+import hashlib
+import logging
+import collections
+
+logger = logging.getLogger(__name__)
+
+# Statistics summed up over all script caches
+script_cache_stats = collections.Counter()
+
+
+class ScriptCache(object):
+    """
+    Caches the results of read-only scripts of a single page instance.
+
+    Results belong to a document version, that is the document token and
+    the number of DOM changes observed in the document. Once a different
+    version is observed all results are dropped. At most C{max_size}
+    results are kept, the least recently used are evicted first.
+
+    @type max_size: int
+    @param max_size: Maximum number of results
+    """
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._results = collections.OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _count(self, stat):
+        setattr(self, stat, getattr(self, stat) + 1)
+        script_cache_stats[stat] += 1
+
+    def __contains__(self, key):
+        return key in self._results
+
+    @staticmethod
+    def key(script, args):
+        return hashlib.sha1(script).hexdigest(), json.dumps(args, sort_keys=True, default=repr)
+
+    def get(self, key):
+        """
+        Returns a cached result.
+
+        @raise KeyError: If the result isn't cached
+        """
+        try:
+            value = self._results.pop(key)
+        except KeyError:
+            self._count('misses')
+            raise
+        self._results[key] = value
+        self._count('hits')
+        return value
+
+    def put(self, key, value):
+        self._results.pop(key, None)
+        self._results[key] = value
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+            self._count('evictions')
+
+    def observe(self, version):
+        """
+        Records the current document version, dropping the results of
+        other versions.
+
+        @type version: tuple
+        @param version: Document token and number of DOM changes
+        @return bool Wether the version is the known one
+        """
+        version = tuple(version)
+        if version == self.version:
+            return True
+        self.invalidate()
+        self.version = version
+        return False
+
+    def invalidate(self):
+        if self._results:
+            self._results.clear()
+            self._count('invalidations')
+        self.version = None
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
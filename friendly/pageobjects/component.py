@@ -0,0 +1,144 @@
+import logging
+from friendly.pageobjects.element import Element, ElementContainer, locate_element, locate_elements
+from friendly.pageobjects.page import PageObjectFactory
+
+logger = logging.getLogger(__name__)
+
+
+class PageComponent(ElementContainer):
+    """
+    Part of a page, bound to a root element.
+
+    Elements of a component are located within its root element, which
+    keeps lookups on large documents fast and locators short. Elements
+    and components are declared like on a C{PageObject}:
+
+    >>> class SearchResult(PageComponent):
+    ...     title = Element(By.CSS_SELECTOR, 'h3')
+    ...
+    >>> class SearchPage(PageObject):
+    ...     results = Components(SearchResult, By.CSS_SELECTOR, '#results > li')
+
+    @param parent: Page or component the component belongs to
+    @type root: PageElement
+    @param root: Root element of the component
+    """
+    def __init__(self, parent, root, **kwargs):
+        self.parent = parent
+        self.root = root
+        self.driver = parent.driver
+        self.product = parent.product
+        self.element_cache = parent.element_cache.child()
+
+    @property
+    def page(self):
+        """
+        The page the component belongs to.
+        """
+        parent = self.parent
+        while isinstance(parent, PageComponent):
+            parent = parent.parent
+        return parent
+
+    @property
+    def tracker(self):
+        return self.page.tracker
+
+    def create_page(self, klass, **kwargs):
+        return self.page.create_page(klass, **kwargs)
+
+    def create_component(self, klass, root, **kwargs):
+        """
+        Creates a component within this one.
+
+        @type klass: PageComponent
+        @param klass: PageComponent to instantiate
+        @param root: Root element of the component or its locator (by, value)
+        @return PageComponent
+        """
+        if isinstance(root, tuple):
+            root = self.find_element(*root)
+        return PageObjectFactory.create_component(self, klass, root, **kwargs)
+
+    def find_element(self, by, value):
+        """
+        Locates an element within the root element.
+
+        @return PageElement
+        """
+        return locate_element(self.root, by, value, self.element_cache)
+
+    def find_elements(self, by, value):
+        """
+        Locates elements within the root element.
+
+        @return list of PageElement
+        """
+        return locate_elements(self.root, by, value, self.element_cache)
+
+
+class ComponentList(object):
+    """
+    Components sharing a locator, like the items of a list.
+
+    The root elements are located with one command on first access, the
+    components are only created when accessed.
+    """
+    def __init__(self, parent, klass, by, value):
+        self._parent = parent
+        self._klass = klass
+        self._by = by
+        self._value = value
+        self._roots = None
+        self._components = {}
+
+    def _get_roots(self):
+        if self._roots is None:
+            self._roots = self._parent.find_elements(self._by, self._value)
+        return self._roots
+
+    def __len__(self):
+        return len(self._get_roots())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        roots = self._get_roots()
+        if index < 0:
+            index += len(roots)
+        if index not in self._components:
+            self._components[index] = self._parent.create_component(self._klass, roots[index])
+        return self._components[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class Component(Element):
+    """
+    Declares a component of a C{PageObject} or C{PageComponent}, located
+    by its root element.
+
+    @type klass: PageComponent
+    @param klass: Class of the component
+    """
+    def __init__(self, klass, by, value):
+        Element.__init__(self, by, value)
+        self.klass = klass
+
+    def __get__(self, parent, owner):
+        if parent is None:
+            return self
+        return parent.element_cache.get(self, lambda: parent.create_component(
+            self.klass, parent.find_element(self.by, self.value)))
+
+
+class Components(Component):
+    """
+    Declares a list of components, created lazily on access.
+    """
+    def __get__(self, parent, owner):
+        if parent is None:
+            return self
+        return parent.element_cache.get(self, lambda: ComponentList(parent, self.klass, self.by, self.value))
@@ -1,14 +1,141 @@
 import os
+import time
 import urlparse
 import datetime
 import logging
+import threading
+import collections
+import contextlib
 from selenium import webdriver
 from selenium.webdriver import DesiredCapabilities, Proxy
 from selenium.webdriver.common.proxy import ProxyType
+from selenium.webdriver.remote.command import Command
 
 logger = logging.getLogger(__name__)
 
 
+class CommandTracker(object):
+    """
+    The C{CommandTracker} observes every command a C{WebDriver} instance
+    sends, including the ones sent by its elements.
+
+    It counts the commands and keeps track of the current URL locally:
+    the URL is known after C{get} and C{current_url} and forgotten after
+    any command which may navigate, like clicks or scripts. Scripts known
+    not to navigate can be run within C{readonly()}.
+
+    Note that after C{get} the requested URL is assumed, redirects are
+    not taken into account.
+
+    The last C{history_size} commands are kept in C{history}, to tell
+    what led to a failure.
+
+    @type driver: WebDriver
+    @param driver: Driver to observe
+    """
+    NAVIGATING_COMMANDS = frozenset([
+        Command.GO_BACK, Command.GO_FORWARD, Command.CLOSE, Command.SWITCH_TO_WINDOW,
+        Command.SWITCH_TO_FRAME, Command.CLICK_ELEMENT, Command.SUBMIT_ELEMENT,
+        Command.SEND_KEYS_TO_ELEMENT, Command.SEND_KEYS_TO_ACTIVE_ELEMENT, Command.TOGGLE_ELEMENT,
+        Command.SET_ELEMENT_SELECTED, Command.EXECUTE_SCRIPT, Command.EXECUTE_ASYNC_SCRIPT,
+        Command.ACCEPT_ALERT, Command.DISMISS_ALERT, Command.CLICK, Command.DOUBLE_CLICK,
+        Command.MOUSE_DOWN, Command.MOUSE_UP, Command.SINGLE_TAP, Command.DOUBLE_TAP,
+        Command.TOUCH_DOWN, Command.TOUCH_UP, Command.LONG_PRESS,
+    ])
+
+    # Commands whose typed value is not kept in the history
+    SECRET_COMMANDS = frozenset([Command.SEND_KEYS_TO_ELEMENT, Command.SEND_KEYS_TO_ACTIVE_ELEMENT])
+
+    # Commands whose script arguments, like filled in form values or
+    # restored cookies, are not kept in the history
+    SCRIPT_COMMANDS = frozenset([Command.EXECUTE_SCRIPT, Command.EXECUTE_ASYNC_SCRIPT])
+
+    history_size = 50
+
+    def __init__(self, driver):
+        self._execute = driver.execute
+        driver.execute = self.execute
+        self._local = threading.local()
+        self.commands = collections.Counter()
+        self.history = collections.deque(maxlen=self.history_size)
+        self.current_url = None
+
+    @classmethod
+    def for_driver(cls, driver):
+        """
+        Returns the tracker of the driver, attaching one if necessary.
+
+        @type driver: WebDriver
+        @return CommandTracker
+        """
+        try:
+            return driver._command_tracker
+        except AttributeError:
+            tracker = driver._command_tracker = cls(driver)
+            return tracker
+
+    @contextlib.contextmanager
+    def readonly(self):
+        """
+        Marks the commands sent within as not navigating.
+        """
+        self._local.readonly = getattr(self._local, 'readonly', 0) + 1
+        try:
+            yield
+        finally:
+            self._local.readonly -= 1
+
+    def execute(self, command, params=None):
+        if command in self.NAVIGATING_COMMANDS and not getattr(self._local, 'readonly', 0):
+            self.current_url = None
+
+        self.commands[command] += 1
+        entry = {'command': command, 'params': self._summarize(command, params), 'time': time.time()}
+        self.history.append(entry)
+        try:
+            response = self._execute(command, params)
+        except Exception as e:
+            entry['error'] = '{0}: {1}'.format(type(e).__name__, e)
+            raise
+        finally:
+            entry['duration'] = time.time() - entry['time']
+
+        if command == Command.GET:
+            self.current_url = params['url']
+        elif command == Command.GET_CURRENT_URL:
+            self.current_url = response['value']
+
+        return response
+
+    def _summarize(self, command, params):
+        if not params:
+            return {}
+        summary = {}
+        for key, value in params.items():
+            if key == 'sessionId':
+                continue
+            if key == 'value' and command in self.SECRET_COMMANDS:
+                value = '<{0} keys>'.format(len(value))
+            elif key == 'args' and command in self.SCRIPT_COMMANDS:
+                value = '<{0} args>'.format(len(value))
+            elif key == 'cookie' and command == Command.ADD_COOKIE:
+                value = dict(value, value='<{0} chars>'.format(len(value.get('value', ''))))
+            elif isinstance(value, basestring) and len(value) > 200:
+                value = value[:200] + '...'
+            summary[key] = value
+        return summary
+
+    def get_current_url(self, driver):
+        """
+        Returns the current URL, requesting it only if it's not known.
+
+        @return str
+        """
+        if self.current_url is None:
+            return driver.current_url
+        return self.current_url
+
+
 class DriverFactory(object):
     """
     The C{DriverFactory} encapsulates the instantiation of new C{WebDriver} instances.
@@ -211,8 +338,30 @@ class DriverManager(object):
 
         self._factory = driver_factory if driver_factory else DriverFactory()
 
-        self._reusebrowser = settings.get('selenium.reusebrowser', True)
-        self._dont_close = settings.get('selenium.dont_close', True)
+        self._recorder = None
+
+    # Read on use, so that the default instance doesn't read the settings
+    # when the module is imported
+    @property
+    def _reusebrowser(self):
+        return self._settings.get('selenium.reusebrowser', True)
+
+    @property
+    def _dont_close(self):
+        return self._settings.get('selenium.dont_close', True)
+
+    def _recording(self):
+        """
+        Returns the settings below C{selenium.recording}.
+
+        @return dict, empty if recording isn't configured
+        """
+        options = {}
+        for key in ('enabled', 'path', 'interval', 'max_interval', 'max_overhead'):
+            name = 'selenium.recording.' + key
+            if name in self._settings:
+                options[key] = self._settings[name]
+        return options
 
     def __del__(self):
         try:
@@ -260,7 +409,9 @@ class DriverManager(object):
         if DriverFactory.TYPE_REMOTE == driver_type and 'selenium.remote_url' in self._settings:
             kwargs['remote_url'] = self._settings['selenium.remote_url']
 
-        return self._factory.create(driver_type, driver_name, **kwargs)
+        driver = self._factory.create(driver_type, driver_name, **kwargs)
+        CommandTracker.for_driver(driver)
+        return driver
 
     def _reset_driver(self):
         logger.info('Resetting driver')
@@ -276,24 +427,85 @@ class DriverManager(object):
             except:
                 logger.error('Could not reset nor close')
 
+    def capture_failure(self, name, **metadata):
+        """
+        Captures the state of the browser after a failure.
+
+        Nothing is captured if no driver was created yet.
+
+        @type name: str
+        @param name: Name of the failure, e.g. the test's
+        @return Task resolving to the path of the bundle or C{None}
+        """
+        if self._driver is None:
+            return None
+        from friendly.pageobjects.artifacts import get_failure_artifacts
+        return get_failure_artifacts().capture(self._driver, name, **metadata)
+
     def get_driver(self):
         logger.info('Getting driver')
         if self._driver is None:
             logger.debug('No driver found')
             self._driver = self._create_driver()
+            recording = self._recording()
+            if recording and recording.get('enabled', True):
+                self.start_recording()
         return self._driver
 
+    @property
+    def recorder(self):
+        return self._recorder
+
+    def start_recording(self, path=None, **kwargs):
+        """
+        Starts recording the session of the driver.
+
+        Defaults are taken from the settings below C{selenium.recording}.
+
+        @type path: str
+        @param path: Path of the frame archive, defaults to a new file in
+                     the directory C{selenium.recording.path}
+        @param kwargs: Arguments of the C{SessionRecorder}
+        @return SessionRecorder
+        """
+        from friendly.pageobjects.recorder import SessionRecorder
+
+        self.stop_recording()
+        options = self._recording()
+        if path is None:
+            filename = datetime.datetime.now().strftime('session-%Y%m%d-%H%M%S-%f.zip')
+            path = os.path.join(options.get('path', './recordings'), filename)
+        for key in ('interval', 'max_interval', 'max_overhead'):
+            if key in options:
+                kwargs.setdefault(key, float(options[key]))
+
+        self._recorder = SessionRecorder(self.get_driver(), path, **kwargs).start()
+        return self._recorder
+
+    def stop_recording(self):
+        """
+        Stops recording, if recording.
+
+        @return Path of the frame archive or C{None}
+        """
+        if self._recorder is None:
+            return None
+        recorder, self._recorder = self._recorder, None
+        return recorder.stop()
+
     def close_driver(self):
         logger.info('Closing driver')
 
-        if self._dont_close:
-            logger.debug('Dont close')
-            return
+        self.stop_recording()
 
         if self._driver is None:
             logger.debug('No driver to close')
             return
 
+        if self._dont_close:
+            logger.debug('Dont close')
+            return
+
         if self._reusebrowser:
             logger.debug('Re-use wanted, trying to only reset the driver')
             self._reset_driver()
@@ -0,0 +1,250 @@
+import weakref
+import logging
+import collections
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.remote.webelement import WebElement
+
+logger = logging.getLogger(__name__)
+
+# Statistics summed up over all element caches
+element_stats = collections.Counter()
+
+# Number of relocations per locator chain, to find frequently re-rendered elements
+stale_locators = collections.Counter()
+
+
+class ElementCache(object):
+    """
+    Caches the located elements of a single page instance.
+
+    Every hit is a C{find_element} round trip saved. Caches of components
+    are children of the cache of their page and invalidated along with it.
+    """
+    def __init__(self):
+        self._elements = {}
+        # Held weakly, so that caches of discarded components go away
+        self._children = weakref.WeakSet()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.relocations = 0
+        self.exhausted = 0
+
+    def _count(self, stat):
+        setattr(self, stat, getattr(self, stat) + 1)
+        element_stats[stat] += 1
+
+    def get(self, key, locate):
+        """
+        Returns the cached element for the given key or locates it.
+
+        @param key: Key of the element
+        @type locate: callable
+        @param locate: Callable locating the element if it's not cached
+        """
+        try:
+            element = self._elements[key]
+        except KeyError:
+            self._count('misses')
+            element = self._elements[key] = locate()
+            return element
+        self._count('hits')
+        return element
+
+    def child(self):
+        """
+        Creates a cache invalidated along with this one.
+
+        @return ElementCache
+        """
+        cache = ElementCache()
+        self._children.add(cache)
+        return cache
+
+    def invalidate(self):
+        """
+        Drops all cached elements, e.g. because the document changed.
+        """
+        for child in list(self._children):
+            child.invalidate()
+        if self._elements:
+            self._elements.clear()
+            self._count('invalidations')
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'relocations': self.relocations,
+            'exhausted': self.exhausted,
+        }
+
+
+class PageElement(WebElement):
+    """
+    A C{WebElement} which remembers how it was located.
+
+    Elements remember their locator and the element they were located
+    within, so they know their locator chain from the document down. If
+    a command fails with a C{StaleElementReferenceException} only the
+    stale element is located again, within its parent, and the command is
+    retried. A stale parent relocates itself the same way. After
+    C{max_relocations} relocations within one command the exception is
+    raised.
+
+    @type locate: callable
+    @param locate: Callable returning a fresh C{WebElement}
+    @type element: WebElement
+    @param element: The located element
+    @type cache: ElementCache
+    @param cache: Cache of the page the element belongs to
+    @type locator: tuple
+    @param locator: (by, value) or (by, value, index) the element was located by
+    @type parent_element: PageElement
+    @param parent_element: Element the element was located within
+    """
+    # Relocations within one command before giving up
+    max_relocations = 3
+
+    def __init__(self, locate, element, cache=None, locator=None, parent_element=None):
+        WebElement.__init__(self, element.parent, element.id)
+        self._locate = locate
+        self._cache = cache
+        self.locator = locator
+        self.parent_element = parent_element
+
+    @property
+    def chain(self):
+        """
+        The locators from the document down to the element.
+
+        @return list of tuples
+        """
+        chain = self.parent_element.chain if self.parent_element is not None else []
+        return chain + [self.locator]
+
+    def describe_chain(self):
+        return ' > '.join('='.join(str(part) for part in locator) for locator in self.chain if locator)
+
+    def relocate(self):
+        chain = self.describe_chain()
+        logger.debug('Relocating stale element %s (%s)', self._id, chain)
+        if self._cache is not None:
+            self._cache._count('relocations')
+        stale_locators[chain] += 1
+        self._id = self._locate().id
+
+    def _execute(self, command, params=None):
+        relocations = 0
+        while True:
+            try:
+                return WebElement._execute(self, command, params)
+            except StaleElementReferenceException:
+                if relocations >= self.max_relocations:
+                    if self._cache is not None:
+                        self._cache._count('exhausted')
+                    logger.warn('Element %s still stale after %d relocations', self.describe_chain(), relocations)
+                    raise
+                relocations += 1
+                self.relocate()
+
+
+def locate_element(context, by, value, cache):
+    """
+    Locates an element which relocates itself once it went stale.
+
+    @param context: Driver or element to search
+    @type cache: ElementCache
+    @return PageElement
+    """
+    locate = lambda: context.find_element(by, value)
+    parent = context if isinstance(context, PageElement) else None
+    return PageElement(locate, locate(), cache, (by, value), parent)
+
+
+def locate_elements(context, by, value, cache):
+    """
+    Locates elements which relocate themselves by their position.
+
+    @param context: Driver or element to search
+    @type cache: ElementCache
+    @return list of PageElement
+    """
+    def locator(index):
+        def locate():
+            elements = context.find_elements(by, value)
+            if index >= len(elements):
+                raise NoSuchElementException('Element {0} of {1}={2} is gone'.format(index, by, value))
+            return elements[index]
+        return locate
+
+    parent = context if isinstance(context, PageElement) else None
+    return [PageElement(locator(i), e, cache, (by, value, i), parent)
+            for i, e in enumerate(context.find_elements(by, value))]
+
+
+class Element(object):
+    """
+    Declares an element of a C{PageObject}.
+
+    The element is located on first access and cached per page instance
+    until the page navigates, reloads or the document is detected to
+    have changed.
+
+    >>> class LoginPage(PageObject):
+    ...     username = Element(By.ID, 'username')
+    ...     submit = Element(By.CSS_SELECTOR, 'form button[type=submit]')
+    ...
+    ...     def login(self, username):
+    ...         self.username.send_keys(username)
+    ...         self.submit.click()
+
+    @type by: str
+    @param by: Locator strategy, see C{selenium.webdriver.common.by.By}
+    @type value: str
+    @param value: Locator value
+    """
+    def __init__(self, by, value):
+        self.by = by
+        self.value = value
+
+    @property
+    def locator(self):
+        return self.by, self.value
+
+    def __get__(self, page, owner):
+        if page is None:
+            return self
+        return page.element_cache.get(self, lambda: page.find_element(self.by, self.value))
+
+
+class Elements(Element):
+    """
+    Declares a list of elements of a C{PageObject}.
+
+    Each element relocates itself by its position within the list.
+    """
+    def __get__(self, page, owner):
+        if page is None:
+            return self
+        return page.element_cache.get(self, lambda: page.find_elements(self.by, self.value))
+
+
+class ElementContainer(object):
+    """
+    Base of classes declaring elements, like pages and components.
+    """
+    @classmethod
+    def get_declared_elements(cls):
+        """
+        Returns the elements declared on the class.
+
+        @return dict of name => Element
+        """
+        elements = {}
+        for name in dir(cls):
+            attr = getattr(cls, name, None)
+            if isinstance(attr, Element):
+                elements[name] = attr
+        return elements
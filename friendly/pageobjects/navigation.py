@@ -0,0 +1,121 @@
+import logging
+import inspect
+import functools
+import threading
+import collections
+
+logger = logging.getLogger(__name__)
+
+# Numbers of direct jumps and walked paths of Product.goto and the
+# navigations they saved compared to the shortest recorded walk
+navigation_stats = collections.Counter()
+
+
+def is_replayable(klass, method):
+    """
+    Checks wether a transition method can be called without arguments.
+    """
+    function = getattr(klass, method, None)
+    if not inspect.ismethod(function):
+        return False
+    function = getattr(function, 'transition_of', function)
+    args, varargs, keywords, defaults = inspect.getargspec(function)
+    return len(args) - len(defaults or ()) <= 1
+
+
+def transition(method):
+    """
+    Decorator marking a page method which leads to another page.
+
+    Whenever the method returns a page of another class, the transition
+    is recorded in the navigation graph, so that C{Product.goto} can
+    replay it if the method takes no arguments. It doesn't matter how
+    the method creates the page, e.g. through a component or a helper.
+
+    >>> class HomePage(PageObject):
+    ...     @transition
+    ...     def open_listing(self):
+    ...         self.menu.listing.click()
+    ...         return self.create_page(ListingPage)
+    """
+    @functools.wraps(method)
+    def record(self, *args, **kwargs):
+        page = method(self, *args, **kwargs)
+        if page is not None:
+            navigation_graph.record(type(self), type(page), method.__name__)
+        return page
+    record.transition_of = method
+    return record
+
+
+class NavigationGraph(object):
+    """
+    Graph of the transitions between PageObject classes observed during
+    the run.
+
+    A transition is recorded whenever a page method decorated with
+    C{transition} returns another page, along with the name of that
+    method, so the transition can be replayed if the method takes no
+    arguments. Pages visited by URL are recorded as entries, from which
+    walks can start.
+    """
+    def __init__(self):
+        self._edges = collections.defaultdict(dict)
+        self._entries = set()
+        self._lock = threading.Lock()
+
+    def record(self, source, target, method):
+        """
+        Records a transition.
+
+        @type source: type
+        @param source: PageObject class the transition started at
+        @type target: type
+        @param target: PageObject class the transition led to
+        @type method: str
+        @param method: Name of the method of C{source} leading to C{target}
+        """
+        if source is target or not is_replayable(source, method):
+            return
+        with self._lock:
+            if target not in self._edges[source]:
+                logger.debug('Recorded transition %s.%s -> %s', source.__name__, method, target.__name__)
+            self._edges[source][target] = method
+
+    def record_entry(self, klass):
+        with self._lock:
+            self._entries.add(klass)
+
+    @property
+    def entries(self):
+        return set(self._entries)
+
+    def transitions(self, source):
+        """
+        @return dict of target class => method name
+        """
+        return dict(self._edges.get(source, {}))
+
+    def path(self, sources, target):
+        """
+        Finds the shortest recorded walk from any of the sources to the
+        target.
+
+        @type sources: list
+        @param sources: PageObject classes to start at
+        @return (source, [method, ...]) or C{None}
+        """
+        queue = collections.deque((s, s, []) for s in sources)
+        seen = set(sources)
+        while queue:
+            source, klass, methods = queue.popleft()
+            if klass is target:
+                return source, methods
+            for successor, method in self.transitions(klass).items():
+                if successor not in seen:
+                    seen.add(successor)
+                    queue.append((source, successor, methods + [method]))
+        return None
+
+
+navigation_graph = NavigationGraph()
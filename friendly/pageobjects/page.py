@@ -1,10 +1,18 @@
+import os
+import time
 import base64
 import logging
+import warnings
 import urlparse
-import datetime
-from selenium import webdriver
 from selenium.webdriver import ActionChains
-from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from friendly.pageobjects import routing, scripts, screenshots, timing, visual, wait
+from friendly.pageobjects.actions import BatchedActionChains
+from friendly.pageobjects.cache import ScriptCache
+from friendly.pageobjects.navigation import navigation_graph
+from friendly.pageobjects.driver import CommandTracker
+from friendly.pageobjects.element import ElementCache, ElementContainer, Elements, locate_element, locate_elements
+from friendly.pageobjects.wait import BrowserWait, all_of
 
 logger = logging.getLogger(__name__)
 
@@ -18,60 +26,460 @@ class PageObjectFactory(object):
         logger.info('Creating new page "%s"', klass.__name__)
         return klass(driver, **kwargs)
 
+    @staticmethod
+    def create_component(parent, klass, root, **kwargs):
+        logger.debug('Creating new component "%s"', klass.__name__)
+        return klass(parent, root, **kwargs)
+
+
+class PageObject(ElementContainer):
+    # URL pattern the page is routed by, set by Router.route
+    url_pattern = None
+
+    # Default timeout of waits in seconds
+    wait_timeout = 10
+
+    # Shorten wait timeouts to the ones suggested by the wait history
+    adaptive_timeouts = False
+
+    # Don't navigate if the browser is known to be at the page's URL already
+    skip_redundant_navigation = False
+
+    # Collect the Navigation Timing on visit(). None collects it only if
+    # it comes along with the load condition, unless the setting
+    # selenium.timing.collect or a performance budget asks for it anyway.
+    collect_timing = None
+
+    # Performance budgets checked on visit(), None disables a budget
+    load_budget_ms = None
+    max_request_count = None
+
+    # Tolerance as a fraction of the budgets and the number of recent
+    # samples whose median is checked against them
+    budget_tolerance = 0.1
+    budget_window = 1
+
+    # 'fail' raises PerformanceBudgetExceeded, 'soft' only warns. Defaults
+    # to the setting selenium.budgets.mode or 'fail'.
+    budget_mode = None
+
+    # Compare the page with its reference screenshot on visit(). Defaults
+    # to the setting selenium.take_reference_screenshot.
+    reference_screenshot = None
+
+    # Regions to ignore in reference screenshots, either boxes
+    # (left, top, right, bottom) in screenshot pixels or element locators
+    reference_ignore_regions = ()
+
+    # Maximum number of results kept by cached_script
+    script_cache_size = 64
 
-class PageObject(object):
     def __init__(self, driver, **kwargs):
         self.driver = driver
+        self.product = kwargs.get('product')
+        self.route_params = kwargs.get('route_params', {})
+        self.element_cache = ElementCache()
+        self.script_cache = ScriptCache(self.script_cache_size)
+        self._document_token = None
+        self.timing = None
+
+    @property
+    def tracker(self):
+        """
+        @rtype: CommandTracker
+        """
+        return CommandTracker.for_driver(self.driver)
 
     def create_page(self, klass, **kwargs):
         """
-        Creates a new page.
+        Creates a new page of the same product.
 
         @type klass: PageObject
         @param klass: PageObject to instantiate
         @return PageObject
         """
+        kwargs.setdefault('product', self.product)
         return PageObjectFactory.create(self.driver, klass, **kwargs)
 
     def reload(self):
-        self.driver.navigate().refresh()
+        self.element_cache.invalidate()
+        self.script_cache.invalidate()
+        self.driver.refresh()
 
     @property
     def url(self):
+        if self.url_pattern is not None:
+            return self.url_pattern.format(**self.route_params)
         return ''
 
+    @classmethod
+    def has_url(cls, params=None):
+        """
+        Checks wether the page can be navigated to by URL, that is it
+        declares its C{url} or a URL pattern whose parameters are given.
+
+        @type params: dict
+        @param params: Parameters of the URL pattern
+        @return bool
+        """
+        if cls.url_pattern is not None:
+            return all(name in (params or {}) for name in routing.parameters(cls.url_pattern))
+        return cls.url is not PageObject.url
+
     def navigate(self):
-        self.driver.get(self.get_current_base_url() + self.url)
+        url = self.get_current_base_url() + self.url
+        if self.skip_redundant_navigation and self.tracker.current_url == url:
+            logger.debug('Already at %s, skipping navigation', url)
+            return
+        self.element_cache.invalidate()
+        self.script_cache.invalidate()
+        self.driver.get(url)
+
+    def find_element(self, by, value):
+        """
+        Locates an element which relocates itself once it went stale.
+
+        @type by: str
+        @param by: Locator strategy
+        @type value: str
+        @param value: Locator value
+        @return PageElement
+        """
+        return locate_element(self.driver, by, value, self.element_cache)
+
+    def find_elements(self, by, value):
+        """
+        Locates elements which relocate themselves by their position.
+
+        @type by: str
+        @param by: Locator strategy
+        @type value: str
+        @param value: Locator value
+        @return list of PageElement
+        """
+        return locate_elements(self.driver, by, value, self.element_cache)
+
+    def execute_script(self, script, *args, **kwargs):
+        """
+        Executes a script, learning the document token along with it.
+
+        If the token changed, the document was replaced and the page's
+        caches are invalidated, without an extra round trip.
+
+        @type script: str
+        @param script: JavaScript function body
+        @type readonly: bool
+        @param readonly: Wether the script is known not to navigate
+        @return The value returned by the script
+        """
+        script = scripts.with_document_token(script)
+        if kwargs.get('readonly'):
+            with self.tracker.readonly():
+                token, value = self.driver.execute_script(script, *args)
+        else:
+            token, value = self.driver.execute_script(script, *args)
+        self.observe_document(token)
+        return value
+
+    def document_token(self):
+        """
+        Returns the token identifying the current document.
+
+        The token is created in the browser on first use and changes with
+        every new document. Prefer C{execute_script}, which learns the
+        token along with the script's value.
+
+        @return str
+        """
+        with self.tracker.readonly():
+            token = self.driver.execute_script(scripts.READ_DOCUMENT_TOKEN)
+        self.observe_document(token)
+        return token
+
+    def cached_script(self, script, *args):
+        """
+        Executes a read-only script, reusing its result as long as the
+        document and its DOM didn't change.
+
+        Results are cached per page by script and arguments along with the
+        document version, which counts the DOM changes reported to a
+        MutationObserver as well as input and change events. The script
+        is sent along with the version of the cached result, the browser
+        only runs it if the version changed. So every call takes one
+        round trip, but a cached result is neither computed nor
+        transferred again.
+
+        @type script: str
+        @param script: JavaScript function body without side effects
+        @return The value returned by the script
+        """
+        cache = self.script_cache
+        key = cache.key(script, args)
+        known = list(cache.version) if key in cache else None
+
+        with self.tracker.readonly():
+            version, value = self.driver.execute_script(scripts.with_document_version(script), *(args + (known,)))
+        self.observe_document(version[0])
+
+        if cache.observe(version) and known is not None:
+            return cache.get(key)
+        cache.put(key, value)
+        return value
+
+    def observe_document(self, token):
+        """
+        Records the token of the current document, invalidating the
+        page's caches if the document changed.
+
+        @type token: str
+        @return bool Wether the document changed
+        """
+        changed = self._document_token is not None and token != self._document_token
+        if changed:
+            logger.debug('Document of %s changed', type(self).__name__)
+            self.element_cache.invalidate()
+            self.script_cache.invalidate()
+        self._document_token = token
+        return changed
+
+    def create_component(self, klass, root, **kwargs):
+        """
+        Creates a component of the page.
+
+        @type klass: PageComponent
+        @param klass: PageComponent to instantiate
+        @param root: Root element of the component or its locator (by, value)
+        @return PageComponent
+        """
+        if isinstance(root, tuple):
+            root = self.find_element(*root)
+        return PageObjectFactory.create_component(self, klass, root, **kwargs)
+
+    def snapshot(self, names=None, properties=('text', 'displayed'), attributes=()):
+        """
+        Reads the state of declared elements within a single round trip.
+
+        >>> state = page.snapshot(['username', 'rows'], properties=['value', 'enabled'])
+        >>> state['username']
+        {u'value': u'jondoe', u'enabled': True}
+
+        Elements declared by C{Elements} yield a list of states, missing
+        elements are C{None}.
+
+        @type names: list
+        @param names: Names of the declared elements, defaults to all
+        @type properties: list
+        @param properties: Any of text, displayed, value, enabled, selected and tag
+        @type attributes: list
+        @param attributes: Names of the attributes to read
+        @return dict of name => state
+        """
+        declared = self.get_declared_elements()
+        if names is None:
+            names = declared.keys()
+
+        locators = {}
+        for name in names:
+            try:
+                element = declared[name]
+            except KeyError:
+                raise ValueError('{0} declares no element "{1}"'.format(type(self).__name__, name))
+            locators[name] = [element.by, element.value, isinstance(element, Elements)]
+
+        return self.execute_script(scripts.SNAPSHOT, locators, list(properties), list(attributes), readonly=True)
 
     def get_waiter(self, **kwargs):
         """
-        @rtype: WebDriverWait
+        @rtype: BrowserWait
         """
-        return WebDriverWait(self.driver, kwargs.get('timeout', 10))
+        return BrowserWait(self.driver, kwargs.get('timeout', self.wait_timeout),
+                           poll_schedule=kwargs.get('poll_schedule'))
 
-    def get_action_chain(self, **kwargs):
+    def get_action_chain(self, batched=False, **kwargs):
         """
-        @rtype: ActionChains
+        @type batched: bool
+        @param batched: Wether to perform the actions with one script
+                        instead of one command per action
+        @rtype: ActionChains or BatchedActionChains
         """
+        if batched:
+            return BatchedActionChains(self.driver)
         return ActionChains(self.driver)
 
-    def wait_until(self, condition):
+    def get_locator(self, element):
+        """
+        Returns the locator of an element.
+
+        @param element: Name of a declared element or a locator (by, value)
+        @return (by, value)
+        """
+        if isinstance(element, basestring):
+            return self.get_declared_elements()[element].locator
+        return tuple(element)
+
+    def fill(self, fields, strict=()):
+        """
+        Fills form fields with one script.
+
+        Text fields are set and input and change events dispatched, like
+        typing would. Checkboxes and radio buttons are checked by bool
+        values, options of selects are chosen by value or text. Fields
+        relying on real keystrokes, like with key handlers, can be filled
+        natively by listing them in C{strict}.
+
+        >>> page.fill({'username': 'jondoe', 'remember': True, (By.NAME, 'country'): 'Germany'})
+
+        @type fields: dict
+        @param fields: Values by name of a declared element or by locator
+        @type strict: iterable or bool
+        @param strict: Fields to fill with native keystrokes, C{True} for all
+        @raise NoSuchElementException: If a field or option isn't found
+        @return self
+        """
+        scripted, native = [], []
+        for field, value in fields.items():
+            (native if strict is True or field in strict else scripted).append((field, value))
+
+        if scripted:
+            failed = self.driver.execute_script(
+                scripts.FILL, [list(self.get_locator(field)) + [value] for field, value in scripted])
+            if failed:
+                raise NoSuchElementException('Could not fill {0}'.format(
+                    ', '.join('{0} ({1})'.format(scripted[index][0], reason) for index, reason in failed)))
+
+        for field, value in native:
+            element = getattr(self, field) if isinstance(field, basestring) else self.find_element(*field)
+            element.clear()
+            element.send_keys(value)
+
+        return self
+
+    def _extract(self, script, args, batch_size, next_page, incremental):
+        offset, turned = 0, False
+        while True:
+            batch = self.execute_script(script, *(args + [offset, batch_size]), readonly=True)
+            if batch is None:
+                raise NoSuchElementException('Could not find {0}={1}'.format(*args[:2]))
+            if batch.get('unknown'):
+                raise ValueError('Unknown columns {0}'.format(', '.join(batch['unknown'])))
+            if turned and not batch['rows']:
+                return
+
+            for row in batch['rows']:
+                yield row
+            offset += len(batch['rows'])
+            if offset < batch['total']:
+                turned = False
+                continue
+
+            if next_page is None or not next_page():
+                return
+            turned = True
+            if not incremental:
+                offset = 0
+
+    def extract_table(self, table, columns=None, batch_size=500, next_page=None, incremental=False):
+        """
+        Streams the rows of a table, reading the cells in the browser.
+
+        Rows are read in batches of C{batch_size} rows per script. Once
+        all rows are read, C{next_page} is called to paginate or load
+        more rows; it returns wether there are more.
+
+        >>> for name, total in page.extract_table('report', columns=['Name', 'Total']):
+        ...     print name, total
+
+        @param table: Name of a declared element or a locator (by, value)
+        @type columns: list
+        @param columns: Columns by index or header text, C{None} for all
+        @type batch_size: int
+        @param batch_size: Number of rows to read per script
+        @type next_page: callable
+        @param next_page: Turns to the next page, returns C{False} at the end
+        @type incremental: bool
+        @param incremental: Wether C{next_page} appends rows instead of
+                            replacing them, like lazy loading
+        @raise NoSuchElementException: If the table isn't found
+        @raise ValueError: If a column isn't found
+        @return Generator of tuples of cell texts
+        """
+        by, value = self.get_locator(table)
+        args = [by, value, list(columns) if columns is not None else None]
+        return (tuple(row) for row in self._extract(scripts.EXTRACT_TABLE, args, batch_size, next_page, incremental))
+
+    def extract_columns(self, table, columns=None, **kwargs):
+        """
+        Reads a table into column arrays, see C{extract_table}.
+
+        @return list of tuples of cell texts, one per column
+        """
+        return zip(*self.extract_table(table, columns, **kwargs))
+
+    def extract_list(self, elements, attribute=None, batch_size=500, next_page=None, incremental=False):
+        """
+        Streams the texts, or the values of an attribute, of elements,
+        reading them in the browser. Paging works like C{extract_table}.
+
+        @param elements: Name of declared elements or a locator (by, value)
+        @type attribute: str
+        @param attribute: Attribute to read instead of the text
+        @return Generator of str
+        """
+        by, value = self.get_locator(elements)
+        return self._extract(scripts.EXTRACT_LIST, [by, value, attribute], batch_size, next_page, incremental)
+
+    def wait_until(self, condition, timeout=None, name=None):
         """
         Waits until the given condition is true.
 
+        The duration is recorded in the wait history, which adapts the
+        poll intervals and, if C{adaptive_timeouts} is set, the timeout.
+        Anonymous conditions like lambdas are neither recorded nor
+        adapted to unless they are given a name.
+
         @type condition: ExpectedCondition
         @param condition: Condition to wait for
+        @type timeout: float
+        @param timeout: Timeout in seconds, defaults to C{wait_timeout}
+        @type name: str
+        @param name: Name of the condition in the wait history, defaults
+                     to C{wait.describe(condition)}
         """
-        self.get_waiter().until(condition)
+        name = name or wait.describe(condition)
+        if name is None:
+            return self.get_waiter(timeout=self.wait_timeout if timeout is None else timeout).until(condition)
+
+        history = wait.get_wait_history()
+        page = type(self).__name__
+
+        if timeout is None:
+            timeout = self.wait_timeout
+            if self.adaptive_timeouts:
+                timeout = history.suggest_timeout(page, name, timeout)
+
+        waiter = self.get_waiter(timeout=timeout, poll_schedule=history.poll_schedule(page, name))
+        start = time.time()
+        try:
+            value = waiter.until(condition)
+        except TimeoutException:
+            history.record(page, name, time.time() - start, timed_out=True)
+            raise
+        history.record(page, name, time.time() - start)
+        return value
 
     def wait_for_page_to_load(self, page_load_condition):
-        self.wait_until(page_load_condition)
+        if isinstance(page_load_condition, (list, tuple)):
+            page_load_condition = all_of(*page_load_condition)
+        return self.wait_until(page_load_condition)
 
     def get_page_load_condition(self):
         """
         Returns the condition under which the page is loaded.
 
-        @returns ExpectedCondition
+        A list of conditions is combined by C{all_of}, which checks the
+        supported ones within a single command.
+
+        @returns ExpectedCondition or list of ExpectedCondition
         """
         raise NotImplementedError()
 
@@ -84,33 +492,237 @@ class PageObject(object):
         """
         if navigate:
             self.navigate()
-        self.wait_for_page_to_load(self.get_page_load_condition())
+            if self.has_url():
+                navigation_graph.record_entry(type(self))
+
+        condition = self.get_page_load_condition()
+        if self.collect_timing is False:
+            # Learn the token of the loaded document along with the last check
+            collecting = wait.collecting(condition, scripts.READ_DOCUMENT_TOKEN)
+            if collecting is not None:
+                value = self.wait_for_page_to_load(collecting)
+                if isinstance(value, list):
+                    self.observe_document(value[1])
+            else:
+                self.wait_for_page_to_load(condition)
+        else:
+            self._wait_and_collect_timing(condition)
+
+        reference_screenshot = self.reference_screenshot
+        if reference_screenshot is None:
+            from friendly.pageobjects.settings import settings
+            reference_screenshot = settings.get('selenium.take_reference_screenshot', False)
+        if reference_screenshot:
+            self.compare_with_reference()
+
         return self
 
+    def _wait_and_collect_timing(self, condition):
+        conditions = list(condition) if isinstance(condition, (list, tuple)) else [condition]
+        budgets = self.get_performance_budgets()
+        if 'load' in budgets:
+            # The load time is only known once the load event finished
+            conditions.append(wait.load_event_finished())
+        condition = all_of(*conditions) if len(conditions) > 1 else conditions[0]
+
+        # Collect the timing along with the last check of the condition
+        # if possible, otherwise ask for it separately.
+        collecting = wait.collecting(condition, scripts.with_document_token(scripts.NAVIGATION_TIMING))
+        if collecting is not None:
+            value = self.wait_for_page_to_load(collecting)
+            if isinstance(value, list):
+                token, sample = value[1]
+                self.observe_document(token)
+            else:
+                sample = None
+        else:
+            self.wait_for_page_to_load(condition)
+            sample = None
+
+        if sample is None and self._requires_timing(budgets):
+            try:
+                sample = self.execute_script(scripts.NAVIGATION_TIMING, readonly=True)
+            except WebDriverException as e:
+                logger.debug('Could not collect the timing of %s (%s)', type(self).__name__, e)
+
+        if sample is not None:
+            self.record_timing(sample)
+            if budgets:
+                self.check_performance_budgets(budgets)
+
+    def _requires_timing(self, budgets):
+        """
+        Checks wether the timing is worth a command of its own.
+        """
+        if budgets or self.collect_timing:
+            return True
+        from friendly.pageobjects.settings import settings
+        return settings.get('selenium.timing.collect', False)
+
+    @property
+    def instance_id(self):
+        """
+        Id of the product instance the page belongs to, if any.
+        """
+        return self.product.instance_id if self.product is not None else None
+
+    def record_timing(self, sample):
+        """
+        Records the timing collected on visit().
+
+        @type sample: dict
+        @param sample: Timing as collected by C{scripts.NAVIGATION_TIMING}
+        """
+        self.timing = sample
+        timing.get_timing_recorder().record(type(self).__name__, self.instance_id, sample)
+
+    def get_performance_budgets(self):
+        """
+        Returns the performance budgets of the page.
+
+        Override to budget further metrics of C{timing.METRICS}.
+
+        @return dict of metric => maximum value
+        """
+        budgets = {}
+        if self.load_budget_ms is not None:
+            budgets['load'] = self.load_budget_ms
+        if self.max_request_count is not None:
+            budgets['requests'] = self.max_request_count
+        return budgets
+
+    def check_performance_budgets(self, budgets=None):
+        """
+        Checks the recorded timing samples of the page against its budgets.
+
+        @raise PerformanceBudgetExceeded: If a budget is exceeded in 'fail' mode
+        @return list of BudgetViolation
+        """
+        if budgets is None:
+            budgets = self.get_performance_budgets()
+
+        page = type(self).__name__
+        violations = timing.check_budgets(page, self.instance_id,
+                                          timing.get_timing_recorder().samples(page, self.instance_id),
+                                          budgets, self.budget_tolerance, self.budget_window)
+        if not violations:
+            return violations
+
+        mode = self.budget_mode
+        if mode is None:
+            from friendly.pageobjects.settings import settings
+            mode = settings.get('selenium.budgets.mode', 'fail')
+
+        if mode == 'soft':
+            timing.soft_failures.extend(violations)
+            warnings.warn(timing.format_violations(violations), timing.PerformanceBudgetWarning)
+        else:
+            raise timing.PerformanceBudgetExceeded(violations)
+        return violations
+
+    def get_reference_name(self):
+        """
+        Returns the name of the page's reference screenshot.
+
+        @return str
+        """
+        browser = self.driver.capabilities.get('browserName')
+        return '_'.join(str(p) for p in (type(self).__name__, self.instance_id, browser) if p)
+
+    def compare_with_reference(self):
+        """
+        Compares a screenshot of the page with its reference screenshot.
+
+        If there is no reference yet, the screenshot becomes it.
+
+        @raise VisualMismatch: If the page differs from the reference
+        @return ComparisonResult
+        """
+        locators = [r for r in self.reference_ignore_regions if isinstance(r[0], basestring)]
+        boxes = [r for r in self.reference_ignore_regions if not isinstance(r[0], basestring)]
+
+        info = None
+        if locators:
+            with self.tracker.readonly():
+                info = self.driver.execute_script(scripts.ELEMENT_RECTS, [list(l) for l in locators])
+
+        png = base64.b64decode(self.driver.get_screenshot_as_base64())
+        if info is not None:
+            boxes.extend(b for b in visual.element_boxes(info, visual.png_size(png)) if b is not None)
+
+        result = visual.get_references().compare(self.get_reference_name(), png, boxes)
+        if not result.matches:
+            raise visual.VisualMismatch(result)
+        return result
+
     def get_current_base_url(self):
         """
         Returns the base-URL of the page.
 
+        That is the base-URL of the page's product instance or, if the
+        page belongs to no product, the one of the current URL.
+
         @return str
         """
-        url = urlparse.urlparse(self.driver.current_url)
+        if self.product is not None:
+            return self.product.base_url
+
+        url = urlparse.urlparse(self.tracker.get_current_url(self.driver))
         base_url = '%(scheme)s://%(netloc)s' % dict((s, getattr(url, s)) for s in url._fields)
         return base_url
 
-    def get_screenshot_filename(self):
-        return datetime.date.today().strftime('screenshot_%Y%m%d_%H%M%S.png')
-
-    def take_screenshot(self):
-        filename = self.get_screenshot_filename()
-        if isinstance(self.driver, webdriver.Remote):
-            # If this is a remote webdriver.  We need to transmit the image data
-            # back across system boundries as a base 64 encoded string so it can
-            # be decoded back on the local system and written to disk.
-            screenshot_file = open(filename, 'wb')
-#            base64_data = self.driver.get_screenshot_as_base64()
-#            screenshot_data = base64.decodestring(base64_data)
-#            screenshot_file.write(screenshot_data)
-            screenshot_file.write(self.driver.get_screenshot_as_png())
-            screenshot_file.close()
-        else:
-            self.driver.save_screenshot(filename)
\ No newline at end of file
+    def get_screenshot_metadata(self):
+        """
+        Returns the metadata stored along with screenshots of the page.
+
+        @return dict
+        """
+        return {
+            'page': type(self).__name__,
+            'instance': self.instance_id,
+            'url': self.tracker.current_url,
+            'test': os.environ.get('PYTEST_CURRENT_TEST'),
+            'time': time.time(),
+        }
+
+    def take_screenshot(self, **metadata):
+        """
+        Takes a screenshot and stores it in the screenshot store.
+
+        Only the capture blocks, the screenshot is decoded and written
+        in the background.
+
+        @param metadata: Metadata to store in addition to the page's
+        @return Task resolving to the path of the screenshot
+        """
+        data = self.driver.get_screenshot_as_base64()
+        return screenshots.get_screenshot_store().save_base64(data, **dict(self.get_screenshot_metadata(), **metadata))
+
+    def capture_elements(self, locators, store=False, **metadata):
+        """
+        Captures images of elements.
+
+        The rects of all elements are fetched with one script and the
+        elements are cropped from one screenshot on a background thread,
+        so this blocks for two commands regardless of the number of
+        elements.
+
+        @type locators: dict
+        @param locators: Locators (by, value) by name, or a list of locators
+        @type store: bool
+        @param store: Wether to write the images to the screenshot store
+        @param metadata: Metadata to store in addition to the page's
+        @return Task resolving to a dict of name => PNG data, or path if
+            stored, or C{None} for elements not found
+        """
+        if not isinstance(locators, dict):
+            locators = dict(enumerate(locators))
+        names = list(locators)
+
+        with self.tracker.readonly():
+            info = self.driver.execute_script(scripts.ELEMENT_RECTS, [list(locators[n]) for n in names])
+        data = self.driver.get_screenshot_as_base64()
+
+        if store:
+            metadata = dict(self.get_screenshot_metadata(), **metadata)
+        return visual.cropper.submit(visual.crop_elements, data, info, names, metadata if store else None)
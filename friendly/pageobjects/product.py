@@ -1,7 +1,12 @@
 from abc import abstractmethod, ABCMeta
 import logging
 import os
+import time
 import urlparse
+from selenium.common.exceptions import WebDriverException
+from friendly.pageobjects import routing, scripts, sessions
+from friendly.pageobjects.driver import CommandTracker
+from friendly.pageobjects.navigation import navigation_graph, navigation_stats
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +16,7 @@ class ProductInstance(object):
     Configuration object for a product's instance.
     """
 
-    def __init__(self, instance_id, base_url):
+    def __init__(self, instance_id, base_url, settings=None):
         """
         Constructor.
 
@@ -19,9 +24,12 @@ class ProductInstance(object):
         @param instance_id: Instance id to use
         @type base_url: str
         @param base_url: Base URL of the instance
+        @type settings: dict
+        @param settings: Settings of the instance, like the credentials
         """
         self.instance_id = instance_id
         self.base_url = base_url
+        self.settings = settings or {}
 
 
 class Product(object):
@@ -30,6 +38,13 @@ class Product(object):
     """
     __metaclass__ = ABCMeta
 
+    # Router resolving the pages of the product, defaults to routing.router
+    router = None
+
+    # Names of the cookies sessions depend on, their expiry limits how long
+    # cached states stay valid; defaults to all cookies
+    session_cookies = None
+
     def __init__(self, driver_manager, instance):
         """
         Constructor.
@@ -45,6 +60,220 @@ class Product(object):
     def driver(self):
         return self._driver_manager.get_driver()
 
+    @property
+    def base_url(self):
+        return self._instance.base_url
+
+    @property
+    def instance_id(self):
+        return self._instance.instance_id
+
+    @property
+    def settings(self):
+        return self._instance.settings
+
+    def login(self, username, password):
+        """
+        Logs in through the UI. Required by C{ensure_logged_in}.
+        """
+        raise NotImplementedError('{0} does not implement login'.format(type(self).__name__))
+
+    def is_logged_in(self):
+        """
+        Probes wether a restored session is still valid. Override to check
+        e.g. for a logout link; by default sessions are valid until their
+        TTL expires.
+
+        @return bool
+        """
+        return True
+
+    def ensure_logged_in(self, username=None, password=None):
+        """
+        Logs in, restoring the cached session of the user if possible.
+
+        Sessions are cached per instance and user in the session store,
+        which parallel workers share: while one logs in, the others wait
+        and reuse its session.
+
+        @type username: str
+        @param username: User to log in, defaults to the instance setting
+        @type password: str
+        @param password: Password, defaults to the instance setting
+        @return bool Wether a cached session was restored
+        """
+        username = username or self.settings.get('username')
+        password = password or self.settings.get('password')
+        store = sessions.get_session_store()
+        key = store.key(self.instance_id, username)
+
+        with store.lock(key):
+            state = store.get(key)
+            if state is not None:
+                self.apply_state(state)
+                if self.is_logged_in():
+                    sessions.session_stats['restored'] += 1
+                    return True
+                logger.info('Cached session of %s on %s is invalid', username, self.instance_id)
+                sessions.session_stats['invalid'] += 1
+                store.invalidate(key)
+
+            self.login(username, password)
+            sessions.session_stats['logins'] += 1
+            state = self.capture_state(('localStorage',))
+            store.save(key, state, self._session_ttl(state, store.ttl))
+            return False
+
+    def _session_ttl(self, state, ttl):
+        expiries = [c['expiry'] for c in state['cookies'] if c.get('expiry') and
+                    (self.session_cookies is None or c['name'] in self.session_cookies)]
+        return min([ttl] + [e - time.time() for e in expiries])
+
+    def capture_state(self, storages=('localStorage', 'sessionStorage')):
+        """
+        Captures the cookies and Web Storage of the current session.
+
+        @type storages: tuple
+        @param storages: Names of the Web Storage areas to capture
+        @return dict
+        """
+        driver = self.driver
+        with CommandTracker.for_driver(driver).readonly():
+            storage = driver.execute_script(scripts.READ_STORAGE, list(storages))
+        return {'url': self.base_url, 'cookies': driver.get_cookies(), 'storage': storage}
+
+    def apply_state(self, state):
+        """
+        Restores a state captured by C{capture_state}.
+
+        Web Storage and cookies are written by one script. HttpOnly
+        cookies, which scripts can't write, and cookies the browser didn't
+        accept from the script are added one by one.
+
+        @type state: dict
+        """
+        driver = self.driver
+        driver.get(state['url'])
+
+        now = time.time()
+        cookies = [dict((k, v) for k, v in c.items() if v is not None)
+                   for c in state['cookies'] if not c.get('expiry') or c['expiry'] >= now]
+        rejected = driver.execute_script(scripts.WRITE_STATE, state['storage'],
+                                         [c for c in cookies if not c.get('httpOnly')]) or []
+
+        for cookie in cookies:
+            if cookie.get('httpOnly') or cookie['name'] in rejected:
+                self._add_cookie(cookie)
+
+    def _add_cookie(self, cookie):
+        try:
+            self.driver.add_cookie(cookie)
+        except WebDriverException:
+            # Some drivers reject the domain of the cookies they return
+            cookie.pop('domain', None)
+            self.driver.add_cookie(cookie)
+
+    def save_state(self, name, storages=('localStorage', 'sessionStorage')):
+        """
+        Saves the cookies and Web Storage of the current session, so that
+        the flow setting them up runs once per suite instead of per test.
+
+        States are kept per instance in the session store, in memory and
+        on disk.
+
+        @type name: str
+        @param name: Name of the state
+        @return dict
+        """
+        store = sessions.get_session_store()
+        state = self.capture_state(storages)
+        return store.save(store.key(self.instance_id, 'state', name), state, self._session_ttl(state, store.ttl))
+
+    def restore_state(self, name):
+        """
+        Restores a state saved by C{save_state}.
+
+        @type name: str
+        @param name: Name of the state
+        @return bool Wether the state was found
+        """
+        store = sessions.get_session_store()
+        state = store.get(store.key(self.instance_id, 'state', name))
+        if state is None:
+            return False
+        self.apply_state(state)
+        return True
+
+    def create_page(self, klass, **kwargs):
+        """
+        Creates a new page of this product.
+
+        @type klass: PageObject
+        @param klass: PageObject to instantiate
+        @return PageObject
+        """
+        from friendly.pageobjects.page import PageObjectFactory
+        return PageObjectFactory.create(self.driver, klass, product=self, **kwargs)
+
+    def current_page(self):
+        """
+        Creates the page the browser is at, resolved by its URL.
+
+        The parameters of the page's URL pattern are passed to the page as
+        C{route_params}.
+
+        @return PageObject or C{None} if no page matches
+        """
+        url = self.driver.current_url
+        match = (self.router or routing.router).match(url)
+        if match is None:
+            logger.debug('No page matches %s', url)
+            return None
+        klass, parameters = match
+        return self.create_page(klass, route_params=parameters)
+
+    def goto(self, klass, **params):
+        """
+        Brings the browser to a page by the shortest known way.
+
+        Pages with a URL are visited directly. Other pages are reached by
+        replaying the shortest walk through C{transition} methods recorded
+        so far, starting at the current page or a page visited by URL
+        before.
+
+        @type klass: PageObject
+        @param klass: Page to go to
+        @param params: Parameters of the page's URL pattern
+        @raise ValueError: If there is no known way to the page
+        @return PageObject
+        """
+        walk = navigation_graph.path(navigation_graph.entries, klass)
+
+        if klass.has_url(params):
+            page = self.create_page(klass, route_params=params)
+            page.visit()
+            navigation_stats['direct'] += 1
+            if walk is not None:
+                navigation_stats['saved'] += len(walk[1])
+            return page
+
+        current = self.current_page()
+        if current is not None:
+            walk = navigation_graph.path([type(current)], klass) or walk
+        if walk is None:
+            raise ValueError('No known way to {0}'.format(klass.__name__))
+
+        source, methods = walk
+        if current is not None and type(current) is source:
+            page = current
+        else:
+            page = self.create_page(source).visit()
+        for method in methods:
+            page = getattr(page, method)()
+
+        navigation_stats['walked'] += 1
+        return page
+
     @abstractmethod
     def visit(self):
         pass
@@ -87,12 +316,9 @@ class ProductManager(object):
             pass
 
         # Look-up instance data from settings
-        for i in self._settings['instances']:
-            if i['instance']['id'] == instance_id:
-                instance_data = i['instance']
-                break
-
-        if not instance_data:
+        try:
+            instance_data = self._settings.collection('instances')[instance_id]
+        except KeyError:
             raise ValueError('Product-instance {0} not found in settings.'.format(instance_id))
 
         # Load product class
@@ -109,7 +335,8 @@ class ProductManager(object):
         url = urlparse.urlparse(instance_url)
         base_url = '%(scheme)s://%(netloc)s' % dict((s, getattr(url, s)) for s in url._fields)
 
-        instance = klass(self._driver_manager, ProductInstance(instance_id, base_url))
+        instance = klass(self._driver_manager,
+                         ProductInstance(instance_id, base_url, instance_data.get('settings')))
 
         self._instances[instance_id] = instance
 
@@ -0,0 +1,27 @@
+"""
+pytest plugin capturing the state of the browser when a test fails, if
+the setting C{selenium.take_screenshot} is enabled.
+
+Enable it in a conftest.py with::
+
+    pytest_plugins = ['friendly.pageobjects.pytest_plugin']
+"""
+import logging
+import pytest
+
+logger = logging.getLogger(__name__)
+
+
+def pytest_runtest_makereport(item, call):
+    if call.excinfo is None or call.excinfo.errisinstance(pytest.skip.Exception):
+        return
+
+    from friendly.pageobjects.settings import settings
+    if not settings.get('selenium.take_screenshot', False):
+        return
+
+    from friendly.pageobjects.driver import driver_manager
+    try:
+        driver_manager.capture_failure(item.nodeid, phase=call.when, error=call.excinfo.exconly())
+    except Exception:
+        logger.exception('Could not capture the failure of %s', item.nodeid)
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import zipfile
+import threading
+from selenium.webdriver.remote.command import Command
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRecorder(object):
+    """
+    Records a browser session by sampling screenshots on a separate thread.
+
+    Frames are requested through the driver's command executor directly,
+    so they neither show up in the C{CommandTracker} nor invalidate its
+    state. Identical consecutive frames are dropped; the rest are stored
+    in a zip archive along with an C{index.json} listing every frame and
+    the time it was captured at.
+
+    The interval adapts to the time captures take: if capturing takes
+    more than C{max_overhead} of the interval, the interval grows up to
+    C{max_interval}, so that slow screenshots don't slow down the test.
+
+    @type driver: WebDriver
+    @param driver: Driver to record
+    @type path: str
+    @param path: Path of the frame archive
+    @type interval: float
+    @param interval: Seconds between frames
+    @type max_interval: float
+    @param max_interval: Maximum seconds between frames
+    @type max_overhead: float
+    @param max_overhead: Maximum fraction of the time spent capturing
+    """
+    def __init__(self, driver, path, interval=1.0, max_interval=10.0, max_overhead=0.2):
+        self.path = path
+        self.interval = interval
+        self.max_interval = max_interval
+        self.max_overhead = max_overhead
+        self._executor = driver.command_executor
+        self._session_id = driver.session_id
+        self._stop = threading.Event()
+        self._thread = None
+        self._index = []
+        self._last_digest = None
+
+        self.current_interval = interval
+        self.captures = 0
+        self.duplicates = 0
+        self.failures = 0
+        self.capture_time = 0.0
+        self.started = None
+        self.stopped = None
+
+    @property
+    def frames(self):
+        return len(self._index)
+
+    @property
+    def overhead(self):
+        """
+        Fraction of the recording's duration spent capturing frames.
+        """
+        elapsed = (self.stopped or time.time()) - self.started if self.started else 0
+        return self.capture_time / elapsed if elapsed else 0.0
+
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError('Recorder already started')
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name='session-recorder')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops recording and waits for the archive to be written.
+
+        @return Path of the archive
+        """
+        if self._thread is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self.stopped = time.time()
+        logger.info('Recorded %d frames (%d duplicates, overhead %.1f%%) to %s',
+                    self.frames, self.duplicates, self.overhead * 100, self.path)
+        return self.path
+
+    def _run(self):
+        archive = zipfile.ZipFile(self.path, 'w')
+        try:
+            while not self._stop.is_set():
+                began = time.time()
+                self._capture(archive)
+                took = time.time() - began
+                self._adapt(took)
+                self._stop.wait(max(self.current_interval - took, 0))
+        finally:
+            archive.writestr('index.json', json.dumps({
+                'started': self.started,
+                'frames': self._index,
+                'captures': self.captures,
+                'duplicates': self.duplicates,
+                'capture_time': self.capture_time,
+            }))
+            archive.close()
+
+    def _capture(self, archive):
+        began = time.time()
+        try:
+            response = self._executor.execute(Command.SCREENSHOT, {'sessionId': self._session_id})
+            data = response['value']
+        except Exception:
+            self.failures += 1
+            logger.debug('Could not capture frame', exc_info=True)
+            return
+        finally:
+            self.captures += 1
+            self.capture_time += time.time() - began
+
+        if response.get('status', 0) != 0 or not data:
+            self.failures += 1
+            return
+
+        digest = hashlib.sha1(data).hexdigest()
+        if digest == self._last_digest:
+            self.duplicates += 1
+            return
+        self._last_digest = digest
+
+        filename = 'frame-{0:05d}.png'.format(len(self._index))
+        archive.writestr(filename, base64.b64decode(data))
+        self._index.append({'file': filename, 'time': began - self.started})
+
+    def _adapt(self, took):
+        if took > self.current_interval * self.max_overhead:
+            self.current_interval = min(took / self.max_overhead, self.max_interval)
+        else:
+            self.current_interval = max(self.current_interval * 0.9, self.interval)
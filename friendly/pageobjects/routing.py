@@ -0,0 +1,94 @@
+import re
+import logging
+import urlparse
+
+logger = logging.getLogger(__name__)
+
+_PARAMETER = re.compile(r'\{(\w+)\}')
+
+
+def parameters(pattern):
+    """
+    Returns the names of the parameters of a URL pattern.
+    """
+    return _PARAMETER.findall(pattern)
+
+
+class Router(object):
+    """
+    Resolves the PageObject class of a URL.
+
+    Patterns are paths with optional C{{name}} parameters matching one
+    path segment, like C{/products/{id}}. Static paths are looked up in a
+    dict, the other patterns are compiled into a single regular
+    expression, so resolving a URL doesn't depend on the number of pages.
+    More specific patterns, that is with more literal characters, win.
+    """
+    def __init__(self):
+        self._static = {}
+        self._patterns = []
+        self._regex = None
+
+    def route(self, pattern):
+        """
+        Class decorator registering a PageObject for a URL pattern, e.g.
+        C{router.route('/products/{id}')}.
+        """
+        def register(klass):
+            self.add(pattern, klass)
+            return klass
+        return register
+
+    def add(self, pattern, klass):
+        klass.url_pattern = pattern
+        if _PARAMETER.search(pattern):
+            self._patterns.append((pattern, klass))
+            self._regex = None
+        else:
+            self._static[self._normalize(pattern)] = klass
+
+    @staticmethod
+    def _normalize(path):
+        return path.rstrip('/') or '/'
+
+    def _compile(self):
+        # Most literal characters first, as the first matching alternative wins
+        self._patterns.sort(key=lambda p: -len(_PARAMETER.sub('', p[0])))
+        alternatives = []
+        for index, (pattern, _) in enumerate(self._patterns):
+            parts = _PARAMETER.split(self._normalize(pattern))
+            regex = ''.join(re.escape(part) if i % 2 == 0 else '(?P<r{0}_{1}>[^/]+)'.format(index, part)
+                            for i, part in enumerate(parts))
+            alternatives.append('(?P<r{0}>{1})'.format(index, regex))
+        self._regex = re.compile('^(?:{0})/?$'.format('|'.join(alternatives)))
+
+    def match(self, url):
+        """
+        Resolves the page of a URL or path.
+
+        @type url: str
+        @param url: URL or path, the query and fragment are ignored
+        @return (PageObject class, dict of parameters) or C{None}
+        """
+        path = self._normalize(urlparse.urlparse(url).path)
+        if path in self._static:
+            return self._static[path], {}
+        if not self._patterns:
+            return None
+
+        if self._regex is None:
+            self._compile()
+        match = self._regex.match(path)
+        if match is None:
+            return None
+
+        index = int(match.lastgroup[1:])
+        prefix = 'r{0}_'.format(index)
+        parameters = dict((name[len(prefix):], value) for name, value in match.groupdict().items()
+                          if name.startswith(prefix))
+        return self._patterns[index][1], parameters
+
+
+# Routes of products that don't declare their own router
+router = Router()
+route = router.route
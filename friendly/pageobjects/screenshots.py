@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+from friendly.pageobjects.worker import BackgroundWorker
+from friendly.pageobjects.settings import lazy
+
+logger = logging.getLogger(__name__)
+
+
+class ScreenshotStore(object):
+    """
+    Stores screenshots by the hash of their content.
+
+    Decoding, hashing and writing happen on a background thread, so
+    taking a screenshot only blocks for the capture command itself.
+    Identical screenshots are stored once; the metadata of every
+    screenshot is appended as a JSON line to C{index.jsonl}.
+
+    @type directory: str
+    @param directory: Directory to store the screenshots in
+    @type worker: BackgroundWorker
+    @param worker: Worker to write with, defaults to a new one
+    """
+    index_filename = 'index.jsonl'
+
+    def __init__(self, directory, worker=None):
+        self.directory = directory
+        self._worker = worker if worker else BackgroundWorker('screenshot-writer')
+        self._known = set()
+        self._lock = threading.Lock()
+
+    def save_base64(self, data, **metadata):
+        """
+        Stores a base64 encoded PNG, as returned by the driver.
+
+        @return Task resolving to the path of the stored file
+        """
+        return self._worker.submit(self._store, data, True, metadata)
+
+    def save_png(self, png, **metadata):
+        """
+        Stores PNG data.
+
+        @return Task resolving to the path of the stored file
+        """
+        return self._worker.submit(self._store, png, False, metadata)
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest + '.png')
+
+    def _store(self, data, encoded, metadata):
+        png = base64.b64decode(data) if encoded else data
+        digest = hashlib.sha1(png).hexdigest()
+        path = self.path(digest)
+
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+
+            if digest not in self._known and not os.path.exists(path):
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(png)
+                os.rename(tmp_path, path)
+            else:
+                logger.debug('Screenshot %s already stored', digest)
+            self._known.add(digest)
+
+            entry = dict(metadata, digest=digest, time=metadata.get('time', time.time()))
+            with open(os.path.join(self.directory, self.index_filename), 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+        return path
+
+    def flush(self):
+        """
+        Waits until all screenshots are written.
+        """
+        self._worker.flush()
+
+
+def _create_screenshot_store():
+    from friendly.pageobjects.settings import settings
+    return ScreenshotStore(settings.get('selenium.screenshots.path', './screenshots'))
+
+get_screenshot_store = lazy(_create_screenshot_store, ScreenshotStore.flush)
@@ -0,0 +1,477 @@
+"""
+JavaScript snippets executed in the browser by the page-objects framework.
+
+Locators are passed to the scripts as C{[by, value]} pairs using the
+strategies of C{selenium.webdriver.common.by.By}.
+"""
+
+# Defines locate(by, value, root) returning an array of all matching elements.
+LOCATE = """
+function locate(by, value, root) {
+    root = root || document;
+    var list = function (nodes) { return Array.prototype.slice.call(nodes); };
+    var attribute = function (name) { return '[' + name + '=' + JSON.stringify(value) + ']'; };
+    var links = function (match) {
+        return list(root.getElementsByTagName('a')).filter(function (a) {
+            return match((a.innerText || a.textContent || '').replace(/^\\s+|\\s+$/g, ''));
+        });
+    };
+    switch (by) {
+        case 'id':
+            if (root === document) {
+                var element = document.getElementById(value);
+                return element ? [element] : [];
+            }
+            return list(root.querySelectorAll(attribute('id')));
+        case 'name':
+            return list(root.querySelectorAll(attribute('name')));
+        case 'css selector':
+            return list(root.querySelectorAll(value));
+        case 'class name':
+            return list(root.getElementsByClassName(value));
+        case 'tag name':
+            return list(root.getElementsByTagName(value));
+        case 'link text':
+            return links(function (text) { return text === value; });
+        case 'partial link text':
+            return links(function (text) { return text.indexOf(value) !== -1; });
+        case 'xpath':
+            var found = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var elements = [];
+            for (var i = 0; i < found.snapshotLength; i++) {
+                elements.push(found.snapshotItem(i));
+            }
+            return elements;
+    }
+    throw new Error('Unsupported locator strategy ' + by);
+}
+"""
+
+# Defines describe(element, properties, attributes) returning the
+# requested state of an element as plain data.
+DESCRIBE = """
+function isDisplayed(element) {
+    if (!(element.offsetWidth || element.offsetHeight || element.getClientRects().length)) {
+        return false;
+    }
+    var style = window.getComputedStyle(element);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+function describe(element, properties, attributes) {
+    var state = {};
+    properties.forEach(function (property) {
+        switch (property) {
+            case 'text':
+                state.text = isDisplayed(element) ?
+                    (element.innerText || element.textContent || '').replace(/^\\s+|\\s+$/g, '') : '';
+                break;
+            case 'displayed': state.displayed = isDisplayed(element); break;
+            case 'value': state.value = element.value === undefined ? null : element.value; break;
+            case 'enabled': state.enabled = !element.disabled; break;
+            case 'selected': state.selected = !!(element.checked || element.selected); break;
+            case 'tag': state.tag = element.tagName.toLowerCase(); break;
+            default: throw new Error('Unsupported property ' + property);
+        }
+    });
+    if (attributes.length) {
+        state.attributes = {};
+        attributes.forEach(function (name) {
+            state.attributes[name] = element.getAttribute(name);
+        });
+    }
+    return state;
+}
+"""
+
+# Arguments: {name: [by, value, many]}, properties, attributes
+SNAPSHOT = LOCATE + DESCRIBE + """
+var locators = arguments[0], properties = arguments[1], attributes = arguments[2];
+var snapshot = {};
+Object.keys(locators).forEach(function (name) {
+    var locator = locators[name];
+    var elements = locate(locator[0], locator[1]).map(function (element) {
+        return describe(element, properties, attributes);
+    });
+    snapshot[name] = locator[2] ? elements : (elements.length ? elements[0] : null);
+});
+return snapshot;
+"""
+
+
+def predicate(body):
+    """
+    Defines predicate(args) from a function body, next to the locate()
+    and isDisplayed() helpers it may use.
+
+    @type body: str
+    @param body: JavaScript function body with access to C{args}
+    @return str
+    """
+    return LOCATE + DESCRIBE + 'function predicate(args) {\n' + body + '\n}\n'
+
+
+# Appended to predicate(). Arguments: args.
+CHECK = """
+return predicate(arguments[0]);
+"""
+
+# Appended to predicate(). Arguments: args, budget in ms, callback.
+# Resolves to [true, value] as soon as the predicate holds, checking on
+# DOM mutations and animation frames, or to [false, null] once the
+# budget is spent.
+WAIT = """
+var args = arguments[0], deadline = Date.now() + arguments[1], done = arguments[arguments.length - 1];
+var finished = false, scheduled = false, observer = null;
+var frame = window.requestAnimationFrame || function (callback) { setTimeout(callback, 16); };
+
+function finish(result) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    done(result);
+}
+
+function check() {
+    if (finished) { return; }
+    var value;
+    try { value = predicate(args); } catch (e) { value = false; }
+    if (value) { return finish([true, value]); }
+    if (Date.now() >= deadline) { return finish([false, null]); }
+    schedule();
+}
+
+function run() {
+    if (!scheduled) { return; }
+    scheduled = false;
+    check();
+}
+
+function schedule() {
+    if (scheduled) { return; }
+    scheduled = true;
+    frame(run);
+    // Animation frames are throttled in background windows
+    setTimeout(run, 100);
+}
+
+if (window.MutationObserver) {
+    observer = new MutationObserver(check);
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+check();
+"""
+
+# Function body returning the Navigation and Paint Timing of the current
+# document in milliseconds, relative to the start of the navigation.
+NAVIGATION_TIMING = """
+var timing = window.performance && window.performance.timing;
+if (!timing) { return null; }
+var start = timing.navigationStart;
+var since = function (end) { return end ? end - start : null; };
+var sample = {
+    start: start,
+    ttfb: since(timing.responseStart),
+    dom_content_loaded: since(timing.domContentLoadedEventEnd),
+    load: since(timing.loadEventEnd),
+    first_paint: null,
+    first_contentful_paint: null,
+    requests: null
+};
+if (window.performance.getEntriesByType) {
+    window.performance.getEntriesByType('paint').forEach(function (entry) {
+        var name = entry.name.replace(/-/g, '_');
+        if (name in sample) { sample[name] = Math.round(entry.startTime); }
+    });
+    sample.requests = window.performance.getEntriesByType('resource').length + 1;
+}
+return sample;
+"""
+
+# Arguments: [[by, value], ...]. Returns the viewport's scroll offset,
+# size and device pixel ratio as well as the bounding rect of the first
+# element found per locator, in CSS pixels relative to the viewport.
+ELEMENT_RECTS = LOCATE + """
+var locators = arguments[0];
+return {
+    scroll_x: window.pageXOffset,
+    scroll_y: window.pageYOffset,
+    width: window.innerWidth,
+    height: window.innerHeight,
+    ratio: window.devicePixelRatio || 1,
+    rects: locators.map(function (locator) {
+        var element = locate(locator[0], locator[1])[0];
+        if (!element) { return null; }
+        var rect = element.getBoundingClientRect();
+        return [rect.left, rect.top, rect.width, rect.height];
+    })
+};
+"""
+
+# Function body returning the URL, title and source of the current page.
+PAGE_STATE = """
+return {
+    url: window.location.href,
+    title: document.title,
+    source: document.documentElement ? document.documentElement.outerHTML : null
+};
+"""
+
+# Arguments: [name, ...] of Web Storage areas, e.g. 'localStorage'.
+# Returns the items of each area by name.
+READ_STORAGE = """
+var state = {};
+arguments[0].forEach(function (name) {
+    var storage = window[name], items = {};
+    for (var i = 0; i < storage.length; i++) {
+        var key = storage.key(i);
+        items[key] = storage.getItem(key);
+    }
+    state[name] = items;
+});
+return state;
+"""
+
+# Arguments: {name: {key: value}} of Web Storage areas and a list of
+# cookies as returned by the driver. Replaces the items of each area and
+# sets the cookies, which must not be HttpOnly. Browsers silently ignore
+# cookies they don't accept, e.g. of other domains or secure ones on
+# http, so the names of the cookies which aren't readable afterwards are
+# returned.
+WRITE_STATE = """
+var state = arguments[0], cookies = arguments[1] || [];
+Object.keys(state).forEach(function (name) {
+    var storage = window[name];
+    storage.clear();
+    Object.keys(state[name]).forEach(function (key) {
+        storage.setItem(key, state[name][key]);
+    });
+});
+cookies.forEach(function (cookie) {
+    var parts = [cookie.name + '=' + cookie.value];
+    parts.push('path=' + (cookie.path || '/'));
+    if (cookie.domain && cookie.domain !== window.location.hostname) { parts.push('domain=' + cookie.domain); }
+    if (cookie.expiry) { parts.push('expires=' + new Date(cookie.expiry * 1000).toUTCString()); }
+    if (cookie.secure) { parts.push('secure'); }
+    if (cookie.sameSite) { parts.push('samesite=' + cookie.sameSite); }
+    document.cookie = parts.join('; ');
+});
+var written = {};
+document.cookie.split('; ').forEach(function (pair) {
+    written[pair] = true;
+});
+return cookies.filter(function (cookie) {
+    return !written[cookie.name + '=' + cookie.value];
+}).map(function (cookie) { return cookie.name; });
+"""
+
+# Defines fire(element, type) dispatching a bubbling event and
+# setValue(element, value) setting the value of a form field like typing.
+FIRE = """
+function fire(element, type, init) {
+    var event;
+    if (/^(mouse|click|dblclick|contextmenu)/.test(type)) {
+        event = document.createEvent('MouseEvents');
+        event.initMouseEvent(type, true, true, window, 1, 0, 0, 0, 0, false, false, false, false,
+                             type === 'contextmenu' ? 2 : 0, null);
+    } else {
+        event = document.createEvent('HTMLEvents');
+        event.initEvent(type, true, true);
+    }
+    return element.dispatchEvent(event);
+}
+function setValue(element, value) {
+    // Use the native setter, so frameworks tracking the value notice the change
+    var descriptor = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(element), 'value');
+    if (descriptor && descriptor.set) {
+        descriptor.set.call(element, value);
+    } else {
+        element.value = value;
+    }
+    fire(element, 'input');
+}
+"""
+
+# Arguments: [[by, value, field value], ...]. Sets the values of form
+# fields and dispatches input and change events. Checkboxes and radio
+# buttons are checked by truthy values, options of selects are chosen by
+# value or text. Returns [index, reason] of the fields that failed.
+FILL = LOCATE + FIRE + """
+var failed = [];
+arguments[0].forEach(function (field, index) {
+    var element = locate(field[0], field[1])[0], value = field[2];
+    if (!element) {
+        failed.push([index, 'not found']);
+        return;
+    }
+    var type = (element.type || '').toLowerCase();
+    if (type === 'checkbox' || type === 'radio') {
+        element.checked = !!value;
+    } else if (element.tagName.toLowerCase() === 'select') {
+        var option = Array.prototype.filter.call(element.options, function (option) {
+            return option.value === String(value) || option.text === String(value);
+        })[0];
+        if (!option) {
+            failed.push([index, 'no option ' + value]);
+            return;
+        }
+        element.value = option.value;
+    } else {
+        setValue(element, value === null ? '' : String(value));
+    }
+    fire(element, 'change');
+});
+return failed;
+"""
+
+# Arguments: [[action, element, data], ...]. Replays queued actions as
+# synthetic DOM events.
+ACTIONS = FIRE + """
+arguments[0].forEach(function (action) {
+    var element = action[1];
+    switch (action[0]) {
+        case 'move':
+            fire(element, 'mouseover');
+            fire(element, 'mousemove');
+            break;
+        case 'click':
+            fire(element, 'mousedown');
+            if (element.focus) { element.focus(); }
+            fire(element, 'mouseup');
+            fire(element, 'click');
+            break;
+        case 'double_click':
+            fire(element, 'dblclick');
+            break;
+        case 'context_click':
+            fire(element, 'contextmenu');
+            break;
+        case 'keys':
+            if (element.focus) { element.focus(); }
+            setValue(element, (element.value || '') + action[2]);
+            fire(element, 'change');
+            break;
+        default:
+            throw new Error('Unsupported action ' + action[0]);
+    }
+});
+"""
+
+# Defines text(element) returning the trimmed visible text of an element.
+TEXT = """
+function text(element) {
+    return element ? (element.innerText || element.textContent || '').replace(/^\\s+|\\s+$/g, '') : null;
+}
+"""
+
+# Arguments: by, value, columns, offset, limit. Returns the header texts,
+# the total number of body rows and the cell texts of the rows from
+# offset on. Columns are given by index or header text, null selects
+# all; unknown header texts are returned as unknown.
+EXTRACT_TABLE = LOCATE + TEXT + """
+var table = locate(arguments[0], arguments[1])[0];
+if (!table) { return null; }
+var columns = arguments[2], offset = arguments[3], limit = arguments[4];
+var header = table.tHead && table.tHead.rows[0];
+var headers = header ? Array.prototype.map.call(header.cells, text) : [];
+var indices = columns && columns.map(function (column) {
+    return typeof column === 'number' ? column : headers.indexOf(column);
+});
+// Rows are read by index, copying them would cost every batch the whole table
+var total = 0, rows = [], skip = offset;
+for (var i = 0; i < table.tBodies.length; i++) {
+    var bodyRows = table.tBodies[i].rows;
+    total += bodyRows.length;
+    for (var j = skip; j < bodyRows.length && rows.length < limit; j++) {
+        var row = bodyRows[j];
+        rows.push(indices ? indices.map(function (index) { return text(row.cells[index]); })
+                          : Array.prototype.map.call(row.cells, text));
+    }
+    skip = Math.max(0, skip - bodyRows.length);
+}
+return {
+    headers: headers,
+    total: total,
+    unknown: columns ? columns.filter(function (column, i) { return indices[i] < 0; }) : [],
+    rows: rows
+};
+"""
+
+# Arguments: by, value, attribute, offset, limit. Returns the total
+# number of matching elements and the texts, or the values of the
+# attribute, of the elements from offset on.
+EXTRACT_LIST = LOCATE + TEXT + """
+var elements = locate(arguments[0], arguments[1]), attribute = arguments[2];
+return {
+    total: elements.length,
+    rows: elements.slice(arguments[3], arguments[3] + arguments[4]).map(function (element) {
+        return attribute ? element.getAttribute(attribute) : text(element);
+    })
+};
+"""
+
+# Defines documentToken() returning a nonce identifying the current
+# document. It's created on first use and lost along with the document.
+DOCUMENT_TOKEN = """
+function documentToken() {
+    if (!window.__pageObjectsToken) {
+        window.__pageObjectsToken = Math.random().toString(36).slice(2) + new Date().getTime().toString(36);
+    }
+    return window.__pageObjectsToken;
+}
+"""
+
+# Function body returning the document token.
+READ_DOCUMENT_TOKEN = DOCUMENT_TOKEN + 'return documentToken();'
+
+# Defines documentVersion() returning [token, version] of the current
+# document. The version counts the DOM changes reported to a
+# MutationObserver installed on first use, as well as input and change
+# events, as typing changes properties the observer doesn't see.
+DOCUMENT_VERSION = DOCUMENT_TOKEN + """
+function documentVersion() {
+    if (window.__pageObjectsVersion === undefined) {
+        window.__pageObjectsVersion = 0;
+        var bump = function () { window.__pageObjectsVersion++; };
+        if (window.MutationObserver) {
+            new MutationObserver(bump).observe(
+                document, {childList: true, subtree: true, attributes: true, characterData: true});
+        }
+        document.addEventListener('input', bump, true);
+        document.addEventListener('change', bump, true);
+    }
+    return [documentToken(), window.__pageObjectsVersion];
+}
+"""
+
+
+def with_document_token(body):
+    """
+    Wraps a function body, so that it returns the document token along
+    with its value.
+
+    @type body: str
+    @param body: JavaScript function body
+    @return str Function body returning C{[token, value]}
+    """
+    return DOCUMENT_TOKEN + 'return [documentToken(), (function () {\n' + body + '\n}).apply(this, arguments)];'
+
+
+def with_document_version(body):
+    """
+    Wraps a function body, so that it returns the document version along
+    with its value.
+
+    The wrapped body takes the version a value is known for as an
+    additional last argument. The body is only run if the document
+    version differs from it, otherwise the value is C{null}.
+
+    @type body: str
+    @param body: JavaScript function body
+    @return str Function body returning C{[[token, version], value]}
+    """
+    return DOCUMENT_VERSION + (
+        'var version = documentVersion(), args = Array.prototype.slice.call(arguments, 0, -1),\n'
+        '    known = arguments[arguments.length - 1];\n'
+        'if (known && known[0] === version[0] && known[1] === version[1]) { return [version, null]; }\n'
+        'return [version, (function () {\n' + body + '\n}).apply(this, args)];')
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import contextlib
+import collections
+from friendly.pageobjects.settings import lazy
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Numbers of restored sessions, invalid sessions and UI logins
+session_stats = collections.Counter()
+
+
+class SessionStore(object):
+    """
+    Stores browser session states, like the cookies and local storage of
+    a logged in user, so that later tests can restore them instead of
+    logging in again.
+
+    States are kept in memory and as JSON files in C{directory}, written
+    atomically, so that parallel workers share them. C{lock(key)} holds
+    an exclusive file lock, so only one worker creates a missing state
+    while the others wait for it.
+
+    @type directory: str
+    @param directory: Directory of the state files or C{None} to keep
+                      states in memory only
+    @type ttl: float
+    @param ttl: Seconds a state stays valid
+    """
+    def __init__(self, directory=None, ttl=3600):
+        self.directory = directory
+        self.ttl = ttl
+        self._states = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        return '-'.join(str(p) for p in parts)
+
+    def _path(self, key, suffix='.json'):
+        return os.path.join(self.directory, hashlib.sha1(key).hexdigest() + suffix)
+
+    def _valid(self, state):
+        return state is not None and state['expires'] > time.time()
+
+    def get(self, key):
+        """
+        Returns a state, unless it's missing or expired.
+
+        @return dict or C{None}
+        """
+        state = self._states.get(key)
+        if not self._valid(state) and self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    state = json.load(f)
+            except (IOError, ValueError):
+                state = None
+        if not self._valid(state):
+            return None
+        self._states[key] = state
+        return state
+
+    def save(self, key, state, ttl=None):
+        """
+        Stores a state.
+
+        @type state: dict
+        @param state: JSON serializable state
+        @type ttl: float
+        @param ttl: Seconds the state stays valid, defaults to C{self.ttl}
+        @return The stored state
+        """
+        state = dict(state, key=key, created=time.time(), expires=time.time() + (self.ttl if ttl is None else ttl))
+        self._states[key] = state
+        if self.directory:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.rename(tmp_path, self._path(key))
+        return state
+
+    def invalidate(self, key):
+        self._states.pop(key, None)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """
+        Holds an exclusive lock on a state, across threads and processes.
+        """
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            if not self.directory or fcntl is None:
+                yield
+                return
+
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            with open(self._path(key, '.lock'), 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _create_session_store():
+    from friendly.pageobjects.settings import settings
+    return SessionStore(settings.get('selenium.sessions.path', './sessions'),
+                        settings.get('selenium.sessions.ttl', 3600))
+
+get_session_store = lazy(_create_session_store)
@@ -3,6 +3,8 @@ import os
 import collections
 import yaml
 
+logger = logging.getLogger(__name__)
+
 
 class Settings(object):
     """
@@ -57,6 +59,7 @@ class Settings(object):
     """
     def __init__(self, settings):
         self._settings = settings
+        self._collections = {}
 
     def __getitem__(self, key):
         return self.get(key)
@@ -86,6 +89,34 @@ class Settings(object):
 
         return val
 
+    def collection(self, key):
+        """
+        Returns an indexed view on a list-valued setting.
+
+        >>> settings.collection('instances')['Instance1']['url']
+        'http://instance1.local'
+
+        The collection is built once per loaded value.
+
+        @type key: str
+        @param key: Key of the list-valued setting
+        @return SettingsCollection
+        """
+        items = self.get(key)
+        try:
+            source, collection = self._collections[key]
+            if source is items:
+                return collection
+        except KeyError:
+            pass
+
+        if not isinstance(items, list):
+            raise TypeError('The key "{0}" is not a list'.format(key))
+
+        collection = SettingsCollection(items)
+        self._collections[key] = (items, collection)
+        return collection
+
     @staticmethod
     def flatten(d, parent_key=''):
         items = []
@@ -111,4 +142,341 @@ class Settings(object):
         return cls(Settings.flatten(data))
 
 
-settings = Settings.from_yaml()
+class SettingsCollection(object):
+    """
+    Indexed view on a list of mappings, like C{instances} or C{browsers}.
+
+    Items wrapped into a single-key mapping (C{- instance: {...}}) are
+    unwrapped and indexed by their C{id} or, lacking one, their C{name}.
+    If several items share a key the first one is indexed. Items are
+    referenced, not copied, and YAML aliases of the same subtree are
+    kept only once.
+
+    @type items: list
+    @param items: List of items as loaded from YAML
+    """
+    index_fields = ('id', 'name')
+
+    def __init__(self, items):
+        self._items = []
+        self._index = {}
+
+        seen = set()
+        for item in items:
+            item = self._unwrap(item)
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            self._items.append(item)
+
+            for field in self.index_fields:
+                if field in item:
+                    self._index.setdefault(item[field], item)
+                    break
+
+    @staticmethod
+    def _unwrap(item):
+        if not isinstance(item, collections.Mapping):
+            raise TypeError('Collection items must be mappings, got {0!r}'.format(item))
+        if len(item) == 1:
+            value = item.values()[0]
+            if isinstance(value, collections.Mapping):
+                return value
+        return item
+
+    def __getitem__(self, key):
+        try:
+            return self._index[key]
+        except KeyError:
+            raise KeyError('No item "{0}" in collection'.format(key))
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def keys(self):
+        return self._index.keys()
+
+    def get(self, key, default_value=None):
+        return self._index.get(key, default_value)
+
+    def filter(self, **criteria):
+        """
+        Returns all items matching the given field values.
+
+        >>> settings.collection('browsers').filter(name='FIREFOX', remote=True)
+        [{'name': 'FIREFOX', 'remote': True, ...}]
+
+        @return list
+        """
+        return [i for i in self._items
+                if all(k in i and i[k] == v for k, v in criteria.items())]
+
+
+# Parsed YAML layers, keyed by their real path. Each entry keeps the
+# file's (mtime, size) so that only modified files get parsed again.
+_layer_cache = {}
+
+
+class SettingsLayer(object):
+    """
+    A single source of settings within a C{LayeredSettings} stack.
+
+    @type name: str
+    @param name: Name of the layer as reported by C{LayeredSettings.explain}
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __contains__(self, key):
+        raise NotImplementedError()
+
+    def __getitem__(self, key):
+        raise NotImplementedError()
+
+    def reload(self):
+        """
+        Drops cached data if the underlying source has changed.
+
+        @return bool
+        """
+        return False
+
+
+class YamlLayer(SettingsLayer):
+    """
+    Settings layer backed by a YAML file.
+
+    The file is not parsed before its first lookup. Parsed files are
+    shared between layers of the same path and only parsed again once
+    the file has been modified.
+
+    @type path: str
+    @param path: Path of the YAML file
+    @type optional: bool
+    @param optional: Treat a missing file as an empty layer
+    """
+    def __init__(self, path, name=None, optional=False):
+        self.path = os.path.realpath(os.path.abspath(path))
+        SettingsLayer.__init__(self, name or os.path.basename(self.path))
+        self.optional = optional
+        self._data = None
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._load()
+        return self._data
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            if self.optional:
+                return None
+            raise IOError('Settings file "{0}" does not exist.'.format(self.path))
+        return st.st_mtime, st.st_size
+
+    def _load(self):
+        version = self._stat()
+
+        cached = _layer_cache.get(self.path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        if version is None:
+            flat = {}
+        else:
+            logger.debug('Parsing settings layer "%s"', self.path)
+            with open(self.path, 'r') as f:
+                data = yaml.safe_load(f)
+            flat = Settings.flatten(data) if data else {}
+
+        _layer_cache[self.path] = (version, flat)
+        return flat
+
+    def reload(self):
+        if self._data is None:
+            return False
+        cached = _layer_cache.get(self.path)
+        if cached is not None and cached[1] is self._data and cached[0] == self._stat():
+            return False
+        self._data = None
+        return True
+
+
+class EnvironmentLayer(SettingsLayer):
+    """
+    Settings layer backed by environment variables.
+
+    A key is looked up as its upper-cased, underscore-separated variant,
+    e.g. C{selenium.remote_url} as C{SELENIUM_REMOTE_URL}. Like for
+    C{Settings.get} only keys with one of the given prefixes can be
+    overridden.
+    """
+    def __init__(self, prefixes=('selenium.',), name='environment'):
+        SettingsLayer.__init__(self, name)
+        self.prefixes = tuple(prefixes)
+
+    @staticmethod
+    def varname(key):
+        return key.replace('.', '_').upper()
+
+    def __contains__(self, key):
+        return key.lower().startswith(self.prefixes) and self.varname(key) in os.environ
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return os.environ[self.varname(key)]
+
+
+class _LayerChain(object):
+    """
+    Read-only mapping resolving each key from the topmost layer defining it.
+
+    A key set to null by the topmost layer defining it is unset.
+    """
+    def __init__(self, layers):
+        self.layers = layers
+
+    def _lookup(self, key):
+        for layer in reversed(self.layers):
+            if key in layer:
+                return layer[key]
+        return None
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+class LayeredSettings(Settings):
+    """
+    Settings merged from several layers.
+
+    Layers are given in ascending precedence, i.e. a key is resolved
+    from the last layer that defines it. Layers are merged lazily per
+    lookup, so nothing is parsed until it is needed and changing one
+    layer never requires parsing the others again.
+
+    Layers are merged per leaf key: a mapping in an overlay doesn't
+    replace the mapping of the base, keys it doesn't mention are still
+    inherited. Set such keys to null (C{~}) in the overlay to unset them,
+    e.g. C{executable_path: ~} in a profile switching the browser.
+
+    @type layers: list
+    @param layers: List of C{SettingsLayer} in ascending precedence
+    """
+    def __init__(self, layers):
+        self.layers = list(layers)
+        Settings.__init__(self, _LayerChain(self.layers))
+
+    def explain(self, key):
+        """
+        Lists the layers defining the given key and their values.
+
+        The first entry is the one supplying the effective value.
+
+        @type key: str
+        @param key: Key to explain
+        @return list of (layer name, value) tuples
+        """
+        return [(layer.name, layer[key]) for layer in reversed(self.layers) if key in layer]
+
+    def reload(self):
+        """
+        Reloads all layers whose source has changed.
+
+        @return list of the names of the reloaded layers
+        """
+        return [layer.name for layer in self.layers if layer.reload()]
+
+    @classmethod
+    def from_profiles(cls, path='./default.yaml', profiles=None, local=True, environment=True):
+        """
+        Creates the layer stack for a base YAML file.
+
+        Next to the base file C{<name>.yaml} the profile overlays
+        C{<name>.<profile>.yaml} and the optional local override
+        C{<name>.local.yaml} are used. Profiles default to the
+        comma-separated list in the environment variable SETTINGS_PROFILES.
+
+        @type path: str
+        @param path: Path of the base YAML file
+        @type profiles: list
+        @param profiles: Names of the profiles to apply, in ascending precedence
+        @type local: bool
+        @param local: Wether to apply the local override file
+        @type environment: bool
+        @param environment: Wether environment variables override the files
+        @return LayeredSettings
+        """
+        if 'USE_SETTINGS' in os.environ:
+            path = os.environ['USE_SETTINGS']
+
+        if profiles is None:
+            profiles = [p.strip() for p in os.environ.get('SETTINGS_PROFILES', '').split(',') if p.strip()]
+
+        stem, ext = os.path.splitext(path)
+
+        layers = [YamlLayer(path)]
+        for profile in profiles:
+            layers.append(YamlLayer('{0}.{1}{2}'.format(stem, profile, ext)))
+        if local:
+            layers.append(YamlLayer('{0}.local{1}'.format(stem, ext), optional=True))
+        if environment:
+            layers.append(EnvironmentLayer())
+
+        return cls(layers)
+
+
+def lazy(factory, atexit_hook=None):
+    """
+    Returns a function creating an instance on its first call and
+    returning that instance from then on.
+
+    Module-level instances configured by the settings are created this
+    way, so that importing a module doesn't read the settings, which
+    fails without a settings file in the working directory.
+
+    >>> get_wait_history = lazy(_create_wait_history, WaitHistory.save)
+
+    @type factory: callable
+    @param factory: Creates the instance
+    @type atexit_hook: callable
+    @param atexit_hook: Called with the instance at exit, if it was created
+    @return callable
+    """
+    instances = []
+
+    def get():
+        if not instances:
+            instances.append(factory())
+            if atexit_hook is not None:
+                try:
+                    import atexit
+                    atexit.register(atexit_hook, instances[0])
+                except:
+                    pass
+        return instances[0]
+    return get
+
+
+settings = LayeredSettings.from_profiles()
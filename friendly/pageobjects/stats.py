@@ -0,0 +1,21 @@
+import math
+
+
+def percentile(values, fraction):
+    """
+    Returns the given percentile of the values (nearest-rank method).
+
+    >>> percentile([1, 2, 3, 4], 0.5)
+    2
+
+    @type values: list
+    @param values: Values, need not be sorted
+    @type fraction: float
+    @param fraction: Percentile as a fraction between 0 and 1
+    @return The percentile or None if there are no values
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = int(math.ceil(fraction * len(ordered)))
+    return ordered[max(rank, 1) - 1]
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import logging
+import collections
+from friendly.pageobjects.stats import percentile
+from friendly.pageobjects.settings import lazy
+
+logger = logging.getLogger(__name__)
+
+# Metrics of a timing sample, in milliseconds except for requests
+METRICS = ('ttfb', 'dom_content_loaded', 'load', 'first_paint', 'first_contentful_paint', 'requests')
+
+BudgetViolation = collections.namedtuple('BudgetViolation', 'page instance metric budget observed samples')
+
+# Violations of budgets checked in soft mode
+soft_failures = []
+
+
+class PerformanceBudgetExceeded(AssertionError):
+    """
+    Raised if a page exceeds one of its performance budgets.
+    """
+    def __init__(self, violations):
+        AssertionError.__init__(self, format_violations(violations))
+        self.violations = violations
+
+
+class PerformanceBudgetWarning(UserWarning):
+    """
+    Issued if a page exceeds one of its performance budgets in soft mode.
+    """
+
+
+def format_violations(violations):
+    return '; '.join('{0} exceeds its {1} budget: {2} > {3} (median of {4} samples)'.format(
+        v.page, v.metric, v.observed, v.budget, v.samples) for v in violations)
+
+
+def check_budgets(page, instance_id, samples, budgets, tolerance=0.0, window=1):
+    """
+    Checks the most recent samples against budgets.
+
+    A budget is exceeded if the median of the last C{window} samples is
+    greater than the budget plus the tolerance, so that a single outlier
+    doesn't fail a budget checked over several samples.
+
+    @type samples: list
+    @param samples: Timing samples, oldest first
+    @type budgets: dict
+    @param budgets: Maximum value per metric
+    @type tolerance: float
+    @param tolerance: Tolerance as a fraction of the budget
+    @type window: int
+    @param window: Number of most recent samples to check
+    @return list of BudgetViolation
+    """
+    violations = []
+    for metric, budget in sorted(budgets.items()):
+        values = [s[metric] for s in samples if s.get(metric) is not None][-window:]
+        if not values:
+            logger.warn('No %s timing for %s, budget not checked', metric, page)
+            continue
+        observed = percentile(values, 0.5)
+        if observed > budget * (1 + tolerance):
+            violations.append(BudgetViolation(page, instance_id, metric, budget, observed, len(values)))
+    return violations
+
+
+class TimingRecorder(object):
+    """
+    Records the Navigation and Paint Timing of visited pages.
+
+    Samples are kept per page class and product instance. The most
+    recent C{window} samples are used for rolling percentiles; if a path
+    is given all samples are appended to that file as JSON lines and the
+    window is initialized from it.
+
+    @type path: str
+    @param path: Path of the time-series file or C{None}
+    """
+    window = 50
+
+    def __init__(self, path=None):
+        self.path = path
+        self._samples = None
+
+    @staticmethod
+    def key(page, instance_id):
+        return '{0}|{1}'.format(page, instance_id or '')
+
+    def _series(self, page, instance_id):
+        if self._samples is None:
+            self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+            self._load()
+        return self._samples[self.key(page, instance_id)]
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warn('Skipping malformed timing sample in %s', self.path)
+                    continue
+                self._samples[self.key(entry['page'], entry['instance'])].append(entry)
+
+    def record(self, page, instance_id, sample):
+        """
+        Records a sample, unless it was already recorded for the same
+        navigation.
+
+        @type page: str
+        @param page: Name of the page class
+        @type instance_id: str
+        @param instance_id: Id of the product instance or C{None}
+        @type sample: dict
+        @param sample: Timing as collected by C{scripts.NAVIGATION_TIMING}
+        @return The recorded entry or C{None}
+        """
+        series = self._series(page, instance_id)
+        if series and series[-1].get('start') == sample.get('start'):
+            return None
+
+        entry = dict((m, sample.get(m)) for m in METRICS)
+        entry.update({'time': time.time(), 'page': page, 'instance': instance_id, 'start': sample.get('start')})
+        series.append(entry)
+
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        return entry
+
+    def samples(self, page, instance_id=None):
+        """
+        Returns the samples within the rolling window, oldest first.
+
+        @return list of dicts
+        """
+        return list(self._series(page, instance_id))
+
+    def percentiles(self, page, instance_id=None, metric='load', fractions=(0.5, 0.9, 0.99)):
+        """
+        Returns rolling percentiles of a metric.
+
+        @type metric: str
+        @param metric: One of C{METRICS}
+        @return dict of fraction => value
+        """
+        values = [s[metric] for s in self._series(page, instance_id) if s.get(metric) is not None]
+        return dict((f, percentile(values, f)) for f in fractions)
+
+
+def _create_timing_recorder():
+    from friendly.pageobjects.settings import settings
+    path = settings['selenium.timing.path'] if 'selenium.timing.path' in settings else None
+    return TimingRecorder(path)
+
+get_timing_recorder = lazy(_create_timing_recorder)
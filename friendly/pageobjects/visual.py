@@ -0,0 +1,281 @@
+import os
+import json
+import base64
+import struct
+import hashlib
+import logging
+from io import BytesIO
+from friendly.pageobjects import screenshots
+from friendly.pageobjects.worker import BackgroundWorker
+from friendly.pageobjects.settings import lazy
+
+try:
+    from PIL import Image, ImageChops, ImageDraw
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+def require_imaging():
+    if Image is None:
+        raise RuntimeError('Visual comparison requires Pillow, install friendly-pageobjects[visual]')
+
+
+def open_png(png):
+    """
+    Decodes PNG data into an RGB image.
+    """
+    require_imaging()
+    return Image.open(BytesIO(png)).convert('RGB')
+
+
+def png_size(png):
+    """
+    Reads the size of a PNG image from its header.
+
+    @return (width, height)
+    """
+    return struct.unpack('>II', png[16:24])
+
+
+def element_boxes(info, image_size):
+    """
+    Converts element rects as returned by C{scripts.ELEMENT_RECTS} into
+    boxes on a screenshot.
+
+    Screenshots taller than the viewport are taken as full-page
+    screenshots, others as viewport screenshots.
+
+    @type info: dict
+    @param info: Result of C{scripts.ELEMENT_RECTS}
+    @type image_size: tuple
+    @param image_size: Size of the screenshot
+    @return list of (left, top, right, bottom) tuples or None per missing element
+    """
+    ratio = info['ratio']
+    full_page = image_size[1] > (info['height'] + 1) * ratio
+    offset_x, offset_y = (info['scroll_x'], info['scroll_y']) if full_page else (0, 0)
+
+    boxes = []
+    for rect in info['rects']:
+        if rect is None:
+            boxes.append(None)
+            continue
+        left, top, width, height = rect
+        box = (int((left + offset_x) * ratio), int((top + offset_y) * ratio),
+               int(round((left + offset_x + width) * ratio)), int(round((top + offset_y + height) * ratio)))
+        boxes.append((max(box[0], 0), max(box[1], 0), min(box[2], image_size[0]), min(box[3], image_size[1])))
+    return boxes
+
+
+def crop_elements(data, info, names, metadata=None):
+    """
+    Crops elements from a screenshot.
+
+    @type data: str
+    @param data: Base64 encoded PNG, as returned by the driver
+    @type info: dict
+    @param info: Result of C{scripts.ELEMENT_RECTS}
+    @type names: list
+    @param names: Names of the elements, in the order of the rects
+    @type metadata: dict
+    @param metadata: Metadata to write the images to the screenshot store
+        with, or C{None} to return the PNG data
+    @return dict of name => PNG data or path, C{None} for missing elements
+    """
+    image = open_png(base64.b64decode(data))
+    images = {}
+    for name, box in zip(names, element_boxes(info, image.size)):
+        if box is None or box[2] <= box[0] or box[3] <= box[1]:
+            images[name] = None
+            continue
+        png = BytesIO()
+        image.crop(box).save(png, 'PNG')
+        images[name] = png.getvalue()
+
+    if metadata is not None:
+        tasks = dict((name, screenshots.get_screenshot_store().save_png(png, element=str(name), **metadata))
+                     for name, png in images.items() if png is not None)
+        images.update((name, task.wait()) for name, task in tasks.items())
+    return images
+
+
+class ComparisonResult(object):
+    """
+    Result of comparing a screenshot with its reference.
+
+    @ivar created: Wether there was no reference and the screenshot became it
+    @ivar changed_tiles: Boxes of the tiles whose hash changed
+    @ivar changed_pixels: Number of pixels differing beyond the threshold
+    @ivar diff_path: Path of the diff image, if there are differences
+    """
+    def __init__(self, name, created=False, changed_tiles=(), changed_pixels=0, diff_path=None, matches=True):
+        self.name = name
+        self.created = created
+        self.changed_tiles = list(changed_tiles)
+        self.changed_pixels = changed_pixels
+        self.diff_path = diff_path
+        self.matches = matches
+
+    def __repr__(self):
+        return '<ComparisonResult {0}: {1} pixels in {2} tiles changed>'.format(
+            self.name, self.changed_pixels, len(self.changed_tiles))
+
+
+class VisualMismatch(AssertionError):
+    """
+    Raised if a screenshot differs from its reference.
+    """
+    def __init__(self, result):
+        AssertionError.__init__(self, '{0} differs from its reference in {1} pixels, see {2}'.format(
+            result.name, result.changed_pixels, result.diff_path))
+        self.result = result
+
+
+class ReferenceScreenshots(object):
+    """
+    Compares screenshots with stored references.
+
+    Along with each reference the hashes of its tiles are stored. A
+    screenshot is split into the same tiles and only tiles whose hash
+    differs are compared pixel by pixel, so an unchanged page costs no
+    more than hashing it and the reference image is not even decoded.
+
+    Ignored regions are blanked in both images before hashing.
+
+    @type directory: str
+    @param directory: Directory of the references
+    @type tile_size: int
+    @param tile_size: Edge length of the tiles in pixels
+    @type threshold: int
+    @param threshold: Maximum difference in a pixel's luminance to be ignored
+    @type max_changed_pixels: int
+    @param max_changed_pixels: Number of changed pixels still considered a match
+    """
+    def __init__(self, directory, tile_size=64, threshold=0, max_changed_pixels=0):
+        self.directory = directory
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.max_changed_pixels = max_changed_pixels
+
+    def _path(self, name, suffix):
+        return os.path.join(self.directory, name + suffix)
+
+    def tiles(self, size):
+        """
+        Returns the boxes of the tiles of an image of the given size.
+        """
+        width, height = size
+        return [(x, y, min(x + self.tile_size, width), min(y + self.tile_size, height))
+                for y in range(0, height, self.tile_size)
+                for x in range(0, width, self.tile_size)]
+
+    def tile_hashes(self, image):
+        return [hashlib.sha1(image.crop(box).tobytes()).hexdigest()[:16] for box in self.tiles(image.size)]
+
+    @staticmethod
+    def _blank(image, regions):
+        if regions:
+            draw = ImageDraw.Draw(image)
+            for box in regions:
+                draw.rectangle([box[0], box[1], box[2] - 1, box[3] - 1], fill=(0, 0, 0))
+        return image
+
+    def has_reference(self, name):
+        return os.path.exists(self._path(name, '.tiles.json'))
+
+    def save_reference(self, name, png, ignore=()):
+        """
+        Stores a screenshot as the reference.
+
+        @type png: str
+        @param png: PNG data
+        @type ignore: list
+        @param ignore: Boxes of regions to ignore
+        """
+        image = self._blank(open_png(png), ignore)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        image.save(self._path(name, '.png'))
+        with open(self._path(name, '.tiles.json'), 'w') as f:
+            json.dump({'size': image.size, 'tile_size': self.tile_size, 'hashes': self.tile_hashes(image)}, f)
+
+    def compare(self, name, png, ignore=()):
+        """
+        Compares a screenshot with its reference.
+
+        Without a reference the screenshot is stored as the reference.
+
+        @type name: str
+        @param name: Name of the reference
+        @type png: str
+        @param png: PNG data
+        @type ignore: list
+        @param ignore: Boxes of regions to ignore
+        @return ComparisonResult
+        """
+        if not self.has_reference(name):
+            logger.info('Storing new reference screenshot "%s"', name)
+            self.save_reference(name, png, ignore)
+            return ComparisonResult(name, created=True)
+
+        with open(self._path(name, '.tiles.json')) as f:
+            manifest = json.load(f)
+
+        image = self._blank(open_png(png), ignore)
+        hashes = self.tile_hashes(image)
+
+        if tuple(manifest['size']) != image.size or manifest['tile_size'] != self.tile_size:
+            changed = self.tiles(image.size)
+            reference = None
+        else:
+            changed = [box for box, new, old in zip(self.tiles(image.size), hashes, manifest['hashes'])
+                       if new != old]
+            if not changed:
+                return ComparisonResult(name)
+            reference = self._blank(Image.open(self._path(name, '.png')).convert('RGB'), ignore)
+
+        changed_pixels = 0
+        mask = Image.new('L', image.size, 0)
+        for box in changed:
+            if reference is None:
+                tile_mask = Image.new('L', (box[2] - box[0], box[3] - box[1]), 255)
+            else:
+                difference = ImageChops.difference(image.crop(box), reference.crop(box))
+                tile_mask = difference.convert('L').point(lambda v: 255 if v > self.threshold else 0)
+            changed_pixels += tile_mask.histogram()[255]
+            mask.paste(tile_mask, box[:2])
+
+        matches = changed_pixels <= self.max_changed_pixels
+        diff_path = None
+        if changed_pixels:
+            diff_path = self._path(name, '.diff.png')
+            self.diff_image(image, mask, changed).save(diff_path)
+
+        return ComparisonResult(name, changed_tiles=changed, changed_pixels=changed_pixels,
+                                diff_path=diff_path, matches=matches)
+
+    @staticmethod
+    def diff_image(image, mask, tiles):
+        """
+        Renders the screenshot faded, with changed pixels in red and
+        changed tiles outlined.
+        """
+        diff = Image.blend(image, Image.new('RGB', image.size, (255, 255, 255)), 0.7)
+        diff.paste((255, 0, 0), mask=mask)
+        draw = ImageDraw.Draw(diff)
+        for box in tiles:
+            draw.rectangle([box[0], box[1], box[2] - 1, box[3] - 1], outline=(255, 0, 0))
+        return diff
+
+
+def _create_references():
+    from friendly.pageobjects.settings import settings
+    return ReferenceScreenshots(settings.get('selenium.reference_screenshots.path', './reference_screenshots'))
+
+get_references = lazy(_create_references)
+
+
+# Crops element images off the critical path
+cropper = BackgroundWorker('element-cropper')
@@ -0,0 +1,575 @@
+import os
+import json
+import time
+import logging
+import weakref
+import tempfile
+import collections
+from contextlib import contextmanager
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.wait import WebDriverWait, POLL_FREQUENCY
+from friendly.pageobjects import scripts
+from friendly.pageobjects.driver import CommandTracker
+from friendly.pageobjects.stats import percentile
+from friendly.pageobjects.settings import lazy
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Per wait mode ('browser' or 'client'): number of waits, commands sent
+# and seconds spent waiting.
+wait_stats = collections.defaultdict(collections.Counter)
+
+# Script timeout last set per driver
+_script_timeouts = weakref.WeakKeyDictionary()
+
+
+class ScriptCondition(object):
+    """
+    Expected condition evaluated within the browser.
+
+    Like any other expected condition it can be called with a driver,
+    but a C{BrowserWait} ships it into the page and gets notified as
+    soon as it holds.
+
+    >>> ScriptCondition('return document.title == args[0];', 'Welcome')
+
+    @type body: str
+    @param body: JavaScript function body returning a truthy value once
+                 the condition holds. It may use C{args} as well as the
+                 C{locate(by, value)} and C{isDisplayed(element)} helpers.
+    @param args: JSON-serializable arguments, available as C{args}
+    """
+    name = None
+
+    def __init__(self, body, *args):
+        self.body = body
+        self.args = list(args)
+
+    def __call__(self, driver):
+        with CommandTracker.for_driver(driver).readonly():
+            return driver.execute_script(scripts.predicate(self.body) + scripts.CHECK, self.args)
+
+    def named(self, name):
+        """
+        Sets the name the condition is reported by, see C{describe}.
+
+        @return ScriptCondition
+        """
+        self.name = name
+        return self
+
+    def __repr__(self):
+        return '{0}({1!r}, {2})'.format(type(self).__name__, self.body, ', '.join(repr(a) for a in self.args))
+
+
+def _locator_name(name, locator, *args):
+    return '{0}({1}={2}{3})'.format(name, locator[0], locator[1], ''.join(', {0!r}'.format(a) for a in args))
+
+
+def _locator_condition(name, body, locator, *args):
+    # The locator is passed as args[0] and args[1], further arguments follow
+    condition = ScriptCondition(body, locator[0], locator[1], *args)
+    return condition.named(_locator_name(name, locator, *args))
+
+
+def document_ready():
+    return ScriptCondition("return document.readyState === 'complete';").named('document_ready()')
+
+
+def load_event_finished():
+    return ScriptCondition('return !!(window.performance && window.performance.timing.loadEventEnd);'
+                           ).named('load_event_finished()')
+
+
+def title_is(title):
+    return ScriptCondition('return document.title === args[0];', title).named('title_is({0!r})'.format(title))
+
+
+def title_contains(title):
+    condition = ScriptCondition('return document.title.indexOf(args[0]) !== -1;', title)
+    return condition.named('title_contains({0!r})'.format(title))
+
+
+def presence_of_element_located(locator):
+    return _locator_condition('presence_of_element_located',
+                              'return locate(args[0], args[1])[0] || false;', locator)
+
+
+def presence_of_all_elements_located(locator):
+    return _locator_condition('presence_of_all_elements_located',
+                              'var elements = locate(args[0], args[1]);'
+                              'return elements.length ? elements : false;', locator)
+
+
+def visibility_of_element_located(locator):
+    return _locator_condition('visibility_of_element_located',
+                              'var element = locate(args[0], args[1])[0];'
+                              'return element && isDisplayed(element) ? element : false;', locator)
+
+
+def invisibility_of_element_located(locator):
+    return _locator_condition('invisibility_of_element_located',
+                              'var element = locate(args[0], args[1])[0];'
+                              'return !element || !isDisplayed(element);', locator)
+
+
+def text_to_be_present_in_element(locator, text):
+    return _locator_condition('text_to_be_present_in_element',
+                              'var element = locate(args[0], args[1])[0];'
+                              'return !!element && (element.innerText || element.textContent || "")'
+                              '.indexOf(args[2]) !== -1;', locator, text)
+
+
+def text_to_be_present_in_element_value(locator, text):
+    return _locator_condition('text_to_be_present_in_element_value',
+                              'var element = locate(args[0], args[1])[0];'
+                              'return !!element && (element.value || "").indexOf(args[2]) !== -1;', locator, text)
+
+
+def element_to_be_clickable(locator):
+    return _locator_condition('element_to_be_clickable',
+                              'var element = locate(args[0], args[1])[0];'
+                              'return element && isDisplayed(element) && !element.disabled ? element : false;',
+                              locator)
+
+
+# Script equivalents of selenium's expected conditions
+_compilers = {
+    expected_conditions.title_is: lambda c: title_is(c.title),
+    expected_conditions.title_contains: lambda c: title_contains(c.title),
+    expected_conditions.presence_of_element_located: lambda c: presence_of_element_located(c.locator),
+    expected_conditions.presence_of_all_elements_located: lambda c: presence_of_all_elements_located(c.locator),
+    expected_conditions.visibility_of_element_located: lambda c: visibility_of_element_located(c.locator),
+    expected_conditions.invisibility_of_element_located: lambda c: invisibility_of_element_located(c.locator),
+    expected_conditions.element_to_be_clickable: lambda c: element_to_be_clickable(c.locator),
+    expected_conditions.text_to_be_present_in_element:
+        lambda c: text_to_be_present_in_element(c.locator, c.text),
+    expected_conditions.text_to_be_present_in_element_value:
+        lambda c: text_to_be_present_in_element_value(c.locator, c.text),
+}
+
+
+def compile_condition(condition):
+    """
+    Returns the C{ScriptCondition} equivalent to the given condition.
+
+    @param condition: Expected condition
+    @return ScriptCondition or None if the condition can't be compiled
+    """
+    if isinstance(condition, ScriptCondition):
+        return condition
+    try:
+        return _compilers[type(condition)](condition)
+    except KeyError:
+        return None
+
+
+def _combine(conditions, mode):
+    # Every condition keeps its own body and arguments, the combined
+    # predicate hands args[i] to the i-th of them.
+    functions = ',\n'.join('function (args) {\n' + c.body + '\n}' for c in conditions)
+    if mode == 'all':
+        check = 'if (!value) { return false; }'
+        result = 'return value;'
+    else:
+        check = 'if (value) { return value; }'
+        result = 'return false;'
+    body = ('var conditions = [' + functions + '], value = true;\n'
+            'for (var i = 0; i < conditions.length; i++) {\n'
+            '    value = conditions[i](args[i]);\n'
+            '    ' + check + '\n'
+            '}\n' + result)
+    return ScriptCondition(body, *[c.args for c in conditions])
+
+
+class CompositeCondition(object):
+    """
+    Combination of expected conditions, see C{all_of} and C{any_of}.
+
+    All conditions which compile to scripts are checked by a single
+    command per poll, the remaining ones are called one by one.
+    """
+    def __init__(self, mode, script, conditions):
+        self.mode = mode
+        self.script = script
+        self.conditions = conditions
+
+    def __call__(self, driver):
+        value = self.script(driver) if self.script else (self.mode == 'all')
+        for condition in self.conditions:
+            if (self.mode == 'all') != bool(value):
+                break
+            value = condition(driver)
+        return value
+
+    def __repr__(self):
+        return '{0}_of({1!r}, {2!r})'.format(self.mode, self.script, self.conditions)
+
+
+def _composite(mode, conditions):
+    compiled, others = [], []
+    for condition in conditions:
+        script = compile_condition(condition)
+        if script is None:
+            others.append(condition)
+        else:
+            compiled.append(script)
+
+    script = _combine(compiled, mode) if compiled else None
+    if not others:
+        return script.named('{0}_of({1})'.format(mode, ', '.join(describe(c) for c in conditions)))
+    return CompositeCondition(mode, script, others)
+
+
+def describe(condition):
+    """
+    Returns a name for the condition which is stable across runs.
+
+    Lambdas can't be told apart by name, so they aren't described, nor
+    is any combination including them.
+
+    @param condition: Expected condition
+    @return str or C{None} for anonymous conditions
+    """
+    if isinstance(condition, ScriptCondition):
+        return condition.name or 'script({0})'.format(' '.join(condition.body.split())[:60])
+    if isinstance(condition, CompositeCondition):
+        conditions = ([condition.script] if condition.script else []) + condition.conditions
+        names = [describe(c) for c in conditions]
+        if None in names:
+            return None
+        return '{0}_of({1})'.format(condition.mode, ', '.join(names))
+
+    name = getattr(condition, '__name__', type(condition).__name__)
+    if name == '<lambda>':
+        return None
+    if hasattr(condition, 'locator'):
+        args = [getattr(condition, a) for a in ('text', 'is_selected') if hasattr(condition, a)]
+        return _locator_name(name, condition.locator, *args)
+    if hasattr(condition, 'title'):
+        return '{0}({1!r})'.format(name, condition.title)
+    return name
+
+
+def collecting(condition, body):
+    """
+    Returns a condition which also collects data once the given
+    condition holds, so that no extra command is needed for it.
+
+    @param condition: Expected condition
+    @type body: str
+    @param body: JavaScript function body returning the data to collect
+    @return ScriptCondition holding C{[value, data]} or C{None} if the
+            condition can't be compiled
+    """
+    compiled = compile_condition(condition)
+    if compiled is None:
+        return None
+    script = ('var value = (function (args) {\n' + compiled.body + '\n})(args);\n'
+              'return value ? [value, (function () {\n' + body + '\n})()] : false;')
+    return ScriptCondition(script, *compiled.args).named(describe(condition))
+
+
+def all_of(*conditions):
+    """
+    Expected condition holding once all given conditions hold.
+
+    Supported conditions are compiled into a single script, so that if
+    all of them are supported the result can be waited for within the
+    browser.
+
+    >>> page.wait_until(all_of(document_ready(),
+    ...                        EC.invisibility_of_element_located((By.ID, 'spinner')),
+    ...                        EC.presence_of_element_located((By.ID, 'content'))))
+
+    @return ScriptCondition or CompositeCondition
+    """
+    return _composite('all', conditions)
+
+
+def any_of(*conditions):
+    """
+    Expected condition holding once any of the given conditions holds.
+
+    @see: all_of
+    @return ScriptCondition or CompositeCondition
+    """
+    return _composite('any', conditions)
+
+
+class BrowserWait(WebDriverWait):
+    """
+    A C{WebDriverWait} which waits for C{ScriptCondition}s, and the
+    expected conditions C{compile_condition} translates into them,
+    within the browser.
+
+    The condition is checked on every DOM mutation and animation frame
+    and reported back through C{execute_async_script} as soon as it
+    holds, instead of being polled every C{poll_frequency} seconds.
+    Long waits are split into slices of C{slice} seconds. Any other
+    condition, or a driver failing to run asynchronous scripts, falls
+    back to client-side polling.
+
+    Note that the driver's script timeout is set to C{slice} plus a
+    small margin.
+    """
+    slice = 10
+    script_timeout_margin = 2
+
+    def __init__(self, driver, timeout, poll_frequency=POLL_FREQUENCY, ignored_exceptions=None,
+                 poll_schedule=None):
+        """
+        @type poll_schedule: iterable
+        @param poll_schedule: Intervals to sleep between client-side polls,
+                              once exhausted C{poll_frequency} is used
+        """
+        WebDriverWait.__init__(self, driver, timeout, poll_frequency, ignored_exceptions)
+        self._poll_schedule = iter(poll_schedule or ())
+
+    def until(self, method, message=''):
+        condition = compile_condition(method)
+        mode = 'client' if condition is None else 'browser'
+        start = time.time()
+        try:
+            if mode == 'browser':
+                return self._until_in_browser(condition, message, method)
+            return self._until_polling(method, message)
+        finally:
+            wait_stats[mode]['waits'] += 1
+            wait_stats[mode]['seconds'] += time.time() - start
+
+    def _set_script_timeout(self):
+        timeout = self.slice + self.script_timeout_margin
+        if _script_timeouts.get(self._driver) != timeout:
+            self._driver.set_script_timeout(timeout)
+            wait_stats['browser']['commands'] += 1
+            _script_timeouts[self._driver] = timeout
+
+    def _until_in_browser(self, condition, message, method):
+        end_time = time.time() + self._timeout
+        script = scripts.predicate(condition.body) + scripts.WAIT
+
+        try:
+            self._set_script_timeout()
+            while True:
+                remaining = end_time - time.time()
+                if remaining <= 0:
+                    break
+                wait_stats['browser']['commands'] += 1
+                with CommandTracker.for_driver(self._driver).readonly():
+                    done, value = self._driver.execute_async_script(
+                        script, condition.args, int(min(remaining, self.slice) * 1000))
+                if done:
+                    return value
+        except WebDriverException as e:
+            logger.debug('Waiting within the browser failed (%s), polling instead', e)
+            return self._until_polling(method, message, end_time, mode='browser')
+
+        raise TimeoutException(message)
+
+    def _until_polling(self, method, message, end_time=None, mode='client'):
+        if end_time is None:
+            end_time = time.time() + self._timeout
+        while True:
+            try:
+                wait_stats[mode]['commands'] += 1
+                value = method(self._driver)
+                if value:
+                    return value
+            except self._ignored_exceptions:
+                pass
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(next(self._poll_schedule, self._poll), remaining))
+        raise TimeoutException(message)
+
+
+class WaitHistory(object):
+    """
+    Durations of waits per page class and condition.
+
+    The history is used to adapt client-side polling and to suggest
+    timeouts from the observed durations. If a path is given the history
+    is loaded from and saved to that JSON file, so that it accumulates
+    across runs. Saving merges the waits recorded since the last save
+    into the file under a lock, so that parallel workers and overlapping
+    runs don't overwrite each other's samples.
+
+    @type path: str
+    @param path: Path of the JSON file or C{None} to keep it in memory
+    """
+    # Number of most recent durations kept per condition
+    max_samples = 200
+    # Number of durations required before suggesting anything
+    min_samples = 20
+
+    # First and maximum poll interval as well as the back-off factor
+    initial_poll = 0.05
+    max_poll = POLL_FREQUENCY
+    backoff = 1.5
+
+    def __init__(self, path=None):
+        self.path = path
+        self._conditions = {}
+        # Waits recorded since the history was last saved
+        self._pending = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def key(page, condition):
+        return '{0}|{1}'.format(page, condition)
+
+    @staticmethod
+    def _new_entry():
+        return {'samples': [], 'count': 0, 'total': 0.0, 'timeouts': 0}
+
+    def _add(self, entry, count, total, timeouts, samples):
+        entry['count'] += count
+        entry['total'] += total
+        entry['timeouts'] += timeouts
+        entry['samples'].extend(samples)
+        del entry['samples'][:-self.max_samples]
+
+    def record(self, page, condition, seconds, timed_out=False):
+        """
+        Records the duration of a wait.
+
+        @type page: str
+        @param page: Name of the page class
+        @type condition: str
+        @param condition: Name of the condition, see C{describe}
+        @type seconds: float
+        @param seconds: Time spent waiting
+        @type timed_out: bool
+        @param timed_out: Wether the wait timed out
+        """
+        samples = [] if timed_out else [round(seconds, 4)]
+        key = self.key(page, condition)
+        for entries in (self._conditions, self._pending):
+            self._add(entries.setdefault(key, self._new_entry()), 1, seconds, int(timed_out), samples)
+
+    def _samples(self, page, condition):
+        entry = self._conditions.get(self.key(page, condition))
+        if entry is None or len(entry['samples']) < self.min_samples:
+            return None
+        return entry['samples']
+
+    def suggest_timeout(self, page, condition, default, factor=2.0, minimum=1.0):
+        """
+        Suggests a timeout of C{factor} times the observed p99 duration.
+
+        The suggestion is not greater than C{default} and C{default} is
+        returned as long as there are too few samples.
+
+        @return float
+        """
+        samples = self._samples(page, condition)
+        if samples is None:
+            return default
+        return min(default, max(minimum, percentile(samples, 0.99) * factor))
+
+    def poll_schedule(self, page, condition):
+        """
+        Yields the intervals to sleep between polls.
+
+        Polling starts tight and backs off until C{max_poll} is reached.
+        If the condition never held before its p10 duration, the first
+        poll is deferred close to that point.
+        """
+        samples = self._samples(page, condition)
+        if samples is not None and percentile(samples, 0.1) > self.initial_poll:
+            yield percentile(samples, 0.1) * 0.8
+
+        interval = self.initial_poll
+        while True:
+            yield interval
+            interval = min(interval * self.backoff, self.max_poll)
+
+    def report(self, top=10):
+        """
+        Returns the conditions which dominate the total waiting time.
+
+        @type top: int
+        @param top: Number of conditions to report
+        @return list of dicts, longest total waiting time first
+        """
+        rows = []
+        for key, entry in self._conditions.items():
+            page, condition = key.split('|', 1)
+            rows.append({
+                'page': page,
+                'condition': condition,
+                'count': entry['count'],
+                'total': entry['total'],
+                'timeouts': entry['timeouts'],
+                'p50': percentile(entry['samples'], 0.5),
+                'p99': percentile(entry['samples'], 0.99),
+            })
+        rows.sort(key=lambda r: r['total'], reverse=True)
+        return rows[:top]
+
+    def format_report(self, top=10):
+        lines = ['{0:>10} {1:>6} {2:>8} {3:>8} {4:>8}  {5}'.format(
+            'total [s]', 'waits', 'p50 [s]', 'p99 [s]', 'timeouts', 'page: condition')]
+        for r in self.report(top):
+            lines.append('{0:>10.2f} {1:>6} {2:>8} {3:>8} {4:>8}  {5}: {6}'.format(
+                r['total'], r['count'], r['p50'], r['p99'], r['timeouts'], r['page'], r['condition']))
+        return '\n'.join(lines)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            return json.load(f)['conditions']
+
+    def load(self):
+        self._conditions = self._read()
+
+    @contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def save(self):
+        """
+        Merges the waits recorded since the last save into the file.
+        """
+        if not self.path or not self._pending:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._locked():
+            conditions = self._read()
+            for key, pending in self._pending.items():
+                self._add(conditions.setdefault(key, self._new_entry()), pending['count'], pending['total'],
+                          pending['timeouts'], pending['samples'])
+
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'conditions': conditions}, f)
+            os.rename(tmp_path, self.path)
+
+        self._conditions = conditions
+        self._pending = {}
+
+
+def _create_wait_history():
+    from friendly.pageobjects.settings import settings
+    path = settings['selenium.wait.history'] if 'selenium.wait.history' in settings else None
+    return WaitHistory(path)
+
+get_wait_history = lazy(_create_wait_history, WaitHistory.save)
@@ -0,0 +1,95 @@
+import sys
+import Queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Task(object):
+    """
+    Pending result of a function run by a C{BackgroundWorker}.
+    """
+    def __init__(self, fn, args, kwargs):
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+
+    def run(self):
+        try:
+            self._result = self._fn(*self._args, **self._kwargs)
+        except Exception:
+            self._exc_info = sys.exc_info()
+            logger.exception('Background task %r failed', self._fn)
+        finally:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Waits for the task and returns its result.
+
+        @raise Exception: The exception raised by the task
+        """
+        if not self._done.wait(timeout):
+            raise RuntimeError('Task did not finish within {0}s'.format(timeout))
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+
+class BackgroundWorker(object):
+    """
+    Runs functions on a daemon thread, one after the other.
+
+    The queue is bounded: once C{max_queue} tasks are pending, C{submit}
+    blocks until there is room again.
+
+    @type name: str
+    @param name: Name of the thread
+    @type max_queue: int
+    @param max_queue: Maximum number of pending tasks
+    """
+    def __init__(self, name, max_queue=32):
+        self.name = name
+        self._queue = Queue.Queue(max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                task.run()
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues a function call.
+
+        @return Task
+        """
+        task = Task(fn, args, kwargs)
+        self._start()
+        self._queue.put(task)
+        return task
+
+    def flush(self):
+        """
+        Waits until all queued tasks are done.
+        """
+        if self._thread is not None:
+            self._queue.join()
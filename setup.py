@@ -30,4 +30,5 @@ setup(name='friendly-pageobjects',
       packages=find_packages(exclude=['tests']),
       install_requires=['selenium==2.37.0',
                         'pyyaml>=3.10'],
+      extras_require={'visual': ['Pillow']},
       cmdclass={'test': PyTest},)
@@ -0,0 +1,127 @@
+import base64
+import pytest
+from selenium import webdriver
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.errorhandler import ErrorCode
+from friendly.pageobjects import scripts
+
+
+class FakeExecutor(object):
+    """
+    Command executor answering wire-protocol commands without a browser.
+
+    Elements are registered per locator, scripts are answered by
+    C{script_handler(script, args)}. Scripts wrapped by
+    C{scripts.with_document_token} or C{scripts.with_document_version}
+    are unwrapped and answered along with C{document_token} and
+    C{document_version}.
+    """
+    TOKEN_PREFIX, TOKEN_SUFFIX = scripts.with_document_token('\0').split('\0')
+    VERSION_PREFIX, VERSION_SUFFIX = scripts.with_document_version('\0').split('\0')
+
+    ELEMENT_COMMANDS = set([
+        Command.CLICK_ELEMENT, Command.CLEAR_ELEMENT, Command.SEND_KEYS_TO_ELEMENT,
+        Command.GET_ELEMENT_TEXT, Command.GET_ELEMENT_ATTRIBUTE, Command.IS_ELEMENT_DISPLAYED,
+        Command.GET_ELEMENT_TAG_NAME, Command.SUBMIT_ELEMENT, Command.FIND_CHILD_ELEMENT,
+        Command.FIND_CHILD_ELEMENTS,
+    ])
+
+    def __init__(self):
+        self.commands = []
+        self.url = 'about:blank'
+        self.elements = {}
+        self.stale = set()
+        self.screenshot = 'fake png'
+        self.cookies = []
+        self.document_token = 'document-1'
+        self.document_version = 0
+        self.script_handler = lambda script, args: None
+        self.async_script_handler = lambda script, args: None
+        self._next_id = 0
+
+    def add_element(self, by, value, count=1):
+        ids = []
+        for _ in range(count):
+            self._next_id += 1
+            ids.append('element-{0}'.format(self._next_id))
+        self.elements[(by, value)] = ids
+        return ids
+
+    def command_count(self, *commands):
+        return len([c for c, _ in self.commands if not commands or c in commands])
+
+    def execute(self, command, params):
+        if command == Command.NEW_SESSION:
+            return {'status': 0, 'sessionId': 'fake', 'value': {}}
+
+        self.commands.append((command, params))
+
+        if command in self.ELEMENT_COMMANDS and params.get('id') in self.stale:
+            return {'status': ErrorCode.STALE_ELEMENT_REFERENCE, 'value': {'message': 'stale'}}
+
+        if command == Command.GET:
+            self.url = params['url']
+        elif command == Command.GET_CURRENT_URL:
+            return {'status': 0, 'value': self.url}
+        elif command in (Command.FIND_ELEMENT, Command.FIND_CHILD_ELEMENT):
+            ids = self.elements.get((params['using'], params['value']))
+            if not ids:
+                return {'status': ErrorCode.NO_SUCH_ELEMENT, 'value': {'message': 'no such element'}}
+            return {'status': 0, 'value': {'ELEMENT': ids[0]}}
+        elif command in (Command.FIND_ELEMENTS, Command.FIND_CHILD_ELEMENTS):
+            ids = self.elements.get((params['using'], params['value']), [])
+            return {'status': 0, 'value': [{'ELEMENT': i} for i in ids]}
+        elif command == Command.EXECUTE_SCRIPT:
+            script = params['script']
+            if script.startswith(self.TOKEN_PREFIX) and script.endswith(self.TOKEN_SUFFIX):
+                body = script[len(self.TOKEN_PREFIX):-len(self.TOKEN_SUFFIX)]
+                return {'status': 0, 'value': [self.document_token, self.script_handler(body, params['args'])]}
+            if script.startswith(self.VERSION_PREFIX) and script.endswith(self.VERSION_SUFFIX):
+                body = script[len(self.VERSION_PREFIX):-len(self.VERSION_SUFFIX)]
+                version = [self.document_token, self.document_version]
+                args, known = params['args'][:-1], params['args'][-1]
+                value = None if known == version else self.script_handler(body, args)
+                return {'status': 0, 'value': [version, value]}
+            if script == scripts.READ_DOCUMENT_TOKEN:
+                return {'status': 0, 'value': self.document_token}
+            return {'status': 0, 'value': self.script_handler(script, params['args'])}
+        elif command == Command.EXECUTE_ASYNC_SCRIPT:
+            return {'status': 0, 'value': self.async_script_handler(params['script'], params['args'])}
+        elif command == Command.SCREENSHOT:
+            return {'status': 0, 'value': base64.b64encode(self.screenshot)}
+        elif command == Command.GET_ALL_COOKIES:
+            return {'status': 0, 'value': list(self.cookies)}
+        elif command == Command.ADD_COOKIE:
+            self.cookies.append(params['cookie'])
+        elif command == Command.DELETE_ALL_COOKIES:
+            self.cookies = []
+        elif command == Command.GET_ELEMENT_TEXT:
+            return {'status': 0, 'value': 'text of ' + params['id']}
+
+        return {'status': 0, 'value': None}
+
+
+class FakeDriverManager(object):
+    """
+    Driver manager handing out the given driver.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+
+    def get_driver(self):
+        return self.driver
+
+
+@pytest.fixture
+def executor():
+    return FakeExecutor()
+
+
+@pytest.fixture
+def driver(executor):
+    return webdriver.Remote(command_executor=executor, desired_capabilities={})
+
+
+@pytest.fixture
+def driver_manager(driver):
+    return FakeDriverManager(driver)
@@ -0,0 +1,57 @@
+import json
+import zipfile
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects.artifacts import FailureArtifacts
+from friendly.pageobjects.driver import CommandTracker, DriverManager
+from friendly.pageobjects.element import Element
+from friendly.pageobjects.page import PageObject
+
+
+class LoginPage(PageObject):
+    username = Element(By.ID, 'username')
+
+
+@pytest.fixture
+def artifacts(tmpdir):
+    return FailureArtifacts(str(tmpdir.join('failures')))
+
+
+def test_bundle_contains_page_state(driver, executor, artifacts):
+    CommandTracker.for_driver(driver)
+    executor.add_element(By.ID, 'password')
+    executor.script_handler = lambda script, args: [] if args else {
+        'url': 'http://example.com/login', 'title': 'Login', 'source': u'<html>\u2713</html>'}
+    driver.get('http://example.com/login')
+    driver.find_element(By.ID, 'password').send_keys('secret')
+    LoginPage(driver).fill({'username': 'jondoe', (By.ID, 'password'): 'hunter2'})
+    driver.add_cookie({'name': 'session', 'value': 'cookie-secret'})
+    executor.commands = []
+
+    path = artifacts.capture(driver, 'tests/test_login.py::test_login', error='AssertionError').wait(5)
+    assert [c for c, _ in executor.commands] == [Command.EXECUTE_SCRIPT, Command.SCREENSHOT, Command.GET_LOG]
+
+    bundle = zipfile.ZipFile(path)
+    assert bundle.read('screenshot.png') == executor.screenshot
+    assert bundle.read('source.html').decode('utf-8') == u'<html>\u2713</html>'
+    info = json.loads(bundle.read('info.json'))
+    assert info['url'] == 'http://example.com/login'
+    assert info['error'] == 'AssertionError'
+    assert [c['command'] for c in info['commands']] == [
+        Command.GET, Command.FIND_ELEMENT, Command.SEND_KEYS_TO_ELEMENT, Command.EXECUTE_SCRIPT, Command.ADD_COOKIE]
+    assert info['commands'][-1]['params']['cookie']['name'] == 'session'
+    for secret in ('secret', 'hunter2', 'jondoe'):
+        assert secret not in bundle.read('info.json')
+
+
+def test_tracker_history_is_bounded(driver, monkeypatch):
+    monkeypatch.setattr(CommandTracker, 'history_size', 3)
+    tracker = CommandTracker.for_driver(driver)
+    for i in range(5):
+        driver.get('http://example.com/{0}'.format(i))
+    assert [c['params']['url'] for c in tracker.history] == ['http://example.com/{0}'.format(i) for i in (2, 3, 4)]
+
+
+def test_nothing_is_captured_without_driver():
+    assert DriverManager(settings={}).capture_failure('test') is None
@@ -0,0 +1,106 @@
+import gc
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects.component import PageComponent, Component, Components
+from friendly.pageobjects.element import Element
+from friendly.pageobjects.page import PageObject
+
+
+class SearchResult(PageComponent):
+    title = Element(By.CSS_SELECTOR, 'h3')
+
+
+class SearchForm(PageComponent):
+    query = Element(By.NAME, 'q')
+
+
+class SearchPage(PageObject):
+    form = Component(SearchForm, By.ID, 'search')
+    results = Components(SearchResult, By.CSS_SELECTOR, '#results > li')
+
+
+def test_elements_are_located_within_root(driver, executor):
+    executor.add_element(By.ID, 'search')
+    executor.add_element(By.NAME, 'q')
+    page = SearchPage(driver)
+
+    page.form.query.send_keys('selenium')
+    page.form.query.send_keys('!')
+    assert executor.command_count(Command.FIND_ELEMENT) == 1
+    assert executor.command_count(Command.FIND_CHILD_ELEMENT) == 1
+    assert page.form.page is page
+
+
+def test_components_are_created_lazily(driver, executor):
+    executor.add_element(By.CSS_SELECTOR, '#results > li', count=50)
+    executor.add_element(By.CSS_SELECTOR, 'h3')
+    page = SearchPage(driver)
+
+    assert len(page.results) == 50
+    assert page.results[-1].title.text.startswith('text of')
+    assert page.results[-1] is page.results[49]
+    assert executor.command_count(Command.FIND_ELEMENTS) == 1
+    assert executor.command_count(Command.FIND_CHILD_ELEMENT) == 1
+
+
+def test_components_are_invalidated_with_page(driver, executor):
+    executor.add_element(By.ID, 'search')
+    executor.add_element(By.NAME, 'q')
+    page = SearchPage(driver)
+    page.form.query.click()
+    page.navigate()
+    page.form.query.click()
+    assert executor.command_count(Command.FIND_CHILD_ELEMENT) == 2
+
+
+def test_component_caches_are_released(driver, executor):
+    executor.add_element(By.CSS_SELECTOR, 'li')
+    executor.add_element(By.NAME, 'q')
+    page = SearchPage(driver)
+    root = page.find_element(By.CSS_SELECTOR, 'li')
+    for _ in range(10):
+        page.create_component(SearchForm, root)
+    gc.collect()
+    assert len(page.element_cache._children) == 0
+
+    form = page.create_component(SearchForm, root)
+    for _ in range(3):
+        form.query.click()
+        page.navigate()
+    assert executor.command_count(Command.FIND_CHILD_ELEMENT) == 3
+
+
+def test_only_stale_segments_are_relocated(driver, executor):
+    executor.add_element(By.ID, 'search')
+    executor.add_element(By.NAME, 'q')
+    page = SearchPage(driver)
+    query = page.form.query
+    assert query.chain == [(By.ID, 'search'), (By.NAME, 'q')]
+
+    executor.stale.update([page.form.root.id, query.id])
+    root_id, = executor.add_element(By.ID, 'search')
+    query_id, = executor.add_element(By.NAME, 'q')
+    executor.commands = []
+
+    query.click()
+    assert (page.form.root.id, query.id) == (root_id, query_id)
+    assert [c for c, _ in executor.commands] == [
+        Command.CLICK_ELEMENT, Command.FIND_CHILD_ELEMENT, Command.FIND_ELEMENT,
+        Command.FIND_CHILD_ELEMENT, Command.CLICK_ELEMENT]
+    assert page.element_cache.relocations == 1
+    assert page.form.element_cache.relocations == 1
+
+
+def test_relocations_are_bounded(driver, executor):
+    executor.add_element(By.ID, 'search')
+    executor.add_element(By.NAME, 'q')
+    page = SearchPage(driver)
+    query = page.form.query
+    executor.stale.add(query.id)
+
+    with pytest.raises(StaleElementReferenceException):
+        query.click()
+    assert page.form.element_cache.relocations == query.max_relocations
+    assert page.form.element_cache.exhausted == 1
@@ -1,6 +1,7 @@
 import pytest
 from selenium import webdriver
-from friendly.pageobjects.driver import DriverFactory
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects.driver import DriverFactory, CommandTracker
 
 
 @pytest.fixture
@@ -50,3 +51,29 @@ def test_create_remote_firefox(factory):
     driver.get('http://www.google.de')
     assert driver.current_url == 'http://www.google.de/'
     driver.quit()
+
+
+def test_tracker_knows_url_after_get(driver, executor):
+    tracker = CommandTracker.for_driver(driver)
+    assert CommandTracker.for_driver(driver) is tracker
+
+    driver.get('http://example.com/a')
+    assert tracker.get_current_url(driver) == 'http://example.com/a'
+    assert executor.command_count(Command.GET_CURRENT_URL) == 0
+    assert tracker.commands[Command.GET] == 1
+
+
+def test_tracker_forgets_url_on_navigating_commands(driver, executor):
+    tracker = CommandTracker.for_driver(driver)
+    driver.get('http://example.com/a')
+
+    with tracker.readonly():
+        driver.execute_script('return 1;')
+    assert tracker.current_url == 'http://example.com/a'
+
+    driver.execute_script('location.href = "/b";')
+    assert tracker.current_url is None
+
+    executor.url = 'http://example.com/b'
+    assert tracker.get_current_url(driver) == 'http://example.com/b'
+    assert tracker.current_url == 'http://example.com/b'
@@ -0,0 +1,77 @@
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects import scripts
+from friendly.pageobjects.element import Element
+from friendly.pageobjects.page import PageObject
+
+
+class ReportPage(PageObject):
+    report = Element(By.ID, 'report')
+
+
+class FakeTable(object):
+    headers = ['Name', 'Total']
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.page = 0
+
+    @property
+    def rows(self):
+        return self.pages[self.page]
+
+    def __call__(self, script, args):
+        if script == scripts.EXTRACT_TABLE:
+            by, value, columns, offset, limit = args
+            indices = [c if isinstance(c, int) else self.headers.index(c) for c in columns or [0, 1]]
+            rows = [[row[i] for i in indices] for row in self.rows[offset:offset + limit]]
+            return {'headers': self.headers, 'total': len(self.rows), 'unknown': [], 'rows': rows}
+        if script == scripts.EXTRACT_LIST:
+            by, value, attribute, offset, limit = args
+            return {'total': len(self.rows), 'rows': [row[0] for row in self.rows[offset:offset + limit]]}
+
+    def next_page(self):
+        if self.page + 1 == len(self.pages):
+            return False
+        self.page += 1
+        return True
+
+
+def rows(start, stop):
+    return [['name {0}'.format(i), str(i)] for i in range(start, stop)]
+
+
+def test_rows_are_read_in_batches(driver, executor):
+    executor.script_handler = FakeTable([rows(0, 1200)])
+    extracted = ReportPage(driver).extract_table('report', columns=['Total'], batch_size=500)
+
+    assert next(extracted) == ('0',)
+    assert executor.command_count() == 1
+    assert len(list(extracted)) == 1199
+    assert executor.command_count(Command.EXECUTE_SCRIPT) == 3
+
+
+def test_pages_are_streamed(driver, executor):
+    table = FakeTable([rows(0, 3), rows(3, 5)])
+    executor.script_handler = table
+    extracted = ReportPage(driver).extract_table((By.ID, 'report'), next_page=table.next_page)
+    assert [total for name, total in extracted] == ['0', '1', '2', '3', '4']
+
+
+def test_lazily_loaded_rows_are_streamed(driver, executor):
+    table = FakeTable([rows(0, 3), rows(0, 5), rows(0, 5)])
+    executor.script_handler = table
+    extracted = ReportPage(driver).extract_list('report', next_page=table.next_page, incremental=True)
+    assert list(extracted) == ['name {0}'.format(i) for i in range(5)]
+
+
+def test_columns(driver, executor):
+    executor.script_handler = FakeTable([rows(0, 3)])
+    assert ReportPage(driver).extract_columns('report') == [('name 0', 'name 1', 'name 2'), ('0', '1', '2')]
+
+
+def test_unknown_column(driver, executor):
+    executor.script_handler = lambda script, args: {'headers': [], 'total': 0, 'unknown': ['Total'], 'rows': []}
+    with pytest.raises(ValueError):
+        list(ReportPage(driver).extract_table('report', columns=['Total']))
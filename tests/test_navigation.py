@@ -0,0 +1,107 @@
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects import navigation, wait
+from friendly.pageobjects.component import PageComponent
+from friendly.pageobjects.navigation import NavigationGraph, transition
+from friendly.pageobjects.page import PageObject
+from friendly.pageobjects.product import Product, ProductInstance
+from friendly.pageobjects.routing import Router
+
+router = Router()
+
+
+class Page(PageObject):
+    collect_timing = False
+
+    def get_page_load_condition(self):
+        return wait.document_ready()
+
+
+@router.route('/')
+class HomePage(Page):
+    @transition
+    def open_listing(self):
+        return self.create_page(ListingPage)
+
+    @transition
+    def search(self, term):
+        return self.create_page(ListingPage)
+
+
+class Listing(PageComponent):
+    def open_detail(self):
+        return self.create_page(DetailPage)
+
+
+class ListingPage(Page):
+    @transition
+    def open_detail(self):
+        return self.create_component(Listing, self.find_element(By.ID, 'listing')).open_detail()
+
+
+class DetailPage(Page):
+    pass
+
+
+@router.route('/users/{name}')
+class ProfilePage(Page):
+    pass
+
+
+class Shop(Product):
+    router = router
+
+    def visit(self):
+        pass
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    graph = NavigationGraph()
+    monkeypatch.setattr(navigation, 'navigation_graph', graph)
+    monkeypatch.setattr('friendly.pageobjects.page.navigation_graph', graph)
+    monkeypatch.setattr('friendly.pageobjects.product.navigation_graph', graph)
+    monkeypatch.setattr(navigation, 'navigation_stats', navigation.collections.Counter())
+    monkeypatch.setattr('friendly.pageobjects.product.navigation_stats', navigation.navigation_stats)
+    return graph
+
+
+@pytest.fixture
+def shop(driver_manager, executor):
+    executor.async_script_handler = lambda script, args: [True, True]
+    executor.add_element(By.ID, 'listing')
+    return Shop(driver_manager, ProductInstance('Instance1', 'http://shop.local'))
+
+
+def test_transitions_are_recorded(shop, graph):
+    shop.create_page(HomePage).visit().open_listing().open_detail()
+    HomePage(shop.driver).search('books')
+
+    assert graph.entries == set([HomePage])
+    assert graph.transitions(HomePage) == {ListingPage: 'open_listing'}
+    assert graph.transitions(ListingPage) == {DetailPage: 'open_detail'}
+    assert graph.path([HomePage], DetailPage) == (HomePage, ['open_listing', 'open_detail'])
+
+
+def test_goto_jumps_by_url(shop, graph, executor):
+    shop.create_page(HomePage).visit().open_listing()
+
+    page = shop.goto(ProfilePage, name='jondoe')
+    assert isinstance(page, ProfilePage)
+    assert executor.url == 'http://shop.local/users/jondoe'
+    assert navigation.navigation_stats['direct'] == 1
+
+
+def test_goto_walks_recorded_path(shop, graph, executor):
+    shop.create_page(HomePage).visit().open_listing().open_detail()
+    executor.url = 'http://shop.local/users/jondoe'
+    executor.commands = []
+
+    page = shop.goto(DetailPage)
+    assert isinstance(page, DetailPage)
+    assert executor.command_count(Command.GET) == 1
+    assert navigation.navigation_stats['walked'] == 1
+
+    with pytest.raises(ValueError):
+        shop.goto(Page)
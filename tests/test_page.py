@@ -0,0 +1,241 @@
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects import wait
+from friendly.pageobjects.element import Element, Elements
+from friendly.pageobjects.page import PageObject
+
+
+class LoginPage(PageObject):
+    username = Element(By.ID, 'username')
+    rows = Elements(By.CSS_SELECTOR, 'tr')
+
+    @property
+    def url(self):
+        return '/login'
+
+
+@pytest.fixture
+def page(driver, executor):
+    executor.url = 'http://example.com/start'
+    executor.add_element(By.ID, 'username')
+    executor.add_element(By.CSS_SELECTOR, 'tr', count=3)
+    return LoginPage(driver)
+
+
+def test_element_is_cached(page, executor):
+    page.username.click()
+    page.username.send_keys('jondoe')
+    assert executor.command_count(Command.FIND_ELEMENT) == 1
+    assert page.element_cache.hits == 1
+    assert page.element_cache.misses == 1
+
+
+def test_elements_are_cached(page, executor):
+    assert len(page.rows) == 3
+    assert page.rows[2].text == 'text of element-4'
+    assert executor.command_count(Command.FIND_ELEMENTS) == 1
+
+
+def test_navigate_invalidates(page, executor):
+    page.username.click()
+    page.navigate()
+    page.username.click()
+    assert executor.command_count(Command.FIND_ELEMENT) == 2
+    assert page.element_cache.invalidations == 1
+
+
+def test_reload_invalidates(page, executor):
+    page.username.click()
+    page.reload()
+    page.username.click()
+    assert executor.command_count(Command.FIND_ELEMENT) == 2
+    assert executor.command_count(Command.REFRESH) == 1
+
+
+def test_stale_element_is_relocated(page, executor):
+    element = page.username
+    element.click()
+    executor.stale.add(element.id)
+    executor.add_element(By.ID, 'username')
+
+    element.click()
+    assert element.id == 'element-5'
+    assert page.element_cache.relocations == 1
+    assert page.element_cache.invalidations == 0
+
+
+def test_snapshot_is_one_round_trip(page, executor):
+    calls = []
+
+    def handler(script, args):
+        calls.append(args)
+        return {'username': {'value': 'jondoe'}, 'rows': [{'value': None}] * 3}
+
+    executor.script_handler = handler
+    state = page.snapshot(properties=['value'], attributes=['class'])
+
+    assert state['username'] == {'value': 'jondoe'}
+    assert executor.command_count() == 1
+    assert calls == [[{'username': ['id', 'username', False], 'rows': ['css selector', 'tr', True]},
+                      ['value'], ['class']]]
+
+
+def test_snapshot_unknown_element(page):
+    with pytest.raises(ValueError):
+        page.snapshot(['password'])
+
+
+class FakeProduct(object):
+    base_url = 'http://product.local'
+    instance_id = 'Instance1'
+
+
+def test_navigate_uses_product_base_url(driver, executor):
+    page = LoginPage(driver, product=FakeProduct())
+    page.navigate()
+    assert executor.url == 'http://product.local/login'
+    assert executor.command_count(Command.GET_CURRENT_URL) == 0
+    assert page.create_page(LoginPage).product is page.product
+
+
+def test_navigate_tracks_base_url(page, executor):
+    page.navigate()
+    page.navigate()
+    assert executor.url == 'http://example.com/login'
+    assert executor.command_count(Command.GET_CURRENT_URL) == 1
+
+
+def test_skip_redundant_navigation(page, executor):
+    page.skip_redundant_navigation = True
+    page.navigate()
+    page.navigate()
+    assert executor.command_count(Command.GET) == 1
+
+    page.username.click()
+    executor.url = 'http://example.com/dashboard'
+    page.navigate()
+    assert executor.command_count(Command.GET) == 2
+
+
+class SignupPage(PageObject):
+    username = Element(By.ID, 'username')
+
+
+def test_fill_uses_one_script(driver, executor):
+    fields = dict(((By.NAME, 'field{0}'.format(i)), 'value') for i in range(30))
+    for by, value in fields:
+        executor.add_element(by, value)
+
+    page = SignupPage(driver)
+    for (by, value), text in fields.items():
+        element = driver.find_element(by, value)
+        element.clear()
+        element.send_keys(text)
+    assert executor.command_count() == 90
+
+    executor.commands = []
+    fills = []
+    executor.script_handler = lambda script, args: fills.append(args[0]) or []
+    page.fill(dict(fields, username='jondoe'))
+    assert executor.command_count() == 1
+    assert ['id', 'username', 'jondoe'] in fills[0]
+
+
+def test_fill_strict_fields_natively(driver, executor):
+    executor.add_element(By.ID, 'username')
+    executor.script_handler = lambda script, args: []
+    SignupPage(driver).fill({'username': 'jondoe', (By.NAME, 'email'): 'jon@example.com'}, strict=['username'])
+    assert [c for c, _ in executor.commands] == [
+        Command.EXECUTE_SCRIPT, Command.FIND_ELEMENT, Command.CLEAR_ELEMENT, Command.SEND_KEYS_TO_ELEMENT]
+
+
+def test_fill_reports_missing_fields(driver, executor):
+    executor.script_handler = lambda script, args: [[0, 'not found']]
+    with pytest.raises(NoSuchElementException):
+        SignupPage(driver).fill({'username': 'jondoe'})
+
+
+def test_batched_action_chain(driver, executor):
+    ids = executor.add_element(By.CSS_SELECTOR, 'li', count=3)
+    items = driver.find_elements(By.CSS_SELECTOR, 'li')
+    executor.commands = []
+
+    chain = SignupPage(driver).get_action_chain(batched=True)
+    for item in items:
+        chain.move_to_element(item).click()
+    chain.send_keys('abc').perform()
+
+    assert executor.command_count() == 1
+    actions = executor.commands[0][1]['args'][0]
+    assert [a[0] for a in actions] == ['move', 'click'] * 3 + ['keys']
+    assert actions[-1][1] == {'ELEMENT': ids[2]}
+
+
+def test_document_change_is_piggybacked(page, executor):
+    page.username.click()
+    page.snapshot(['username'])
+    assert page.document_token() == 'document-1'
+    assert page.element_cache.invalidations == 0
+
+    executor.document_token = 'document-2'
+    executor.commands = []
+    page.snapshot(['username'])
+    assert executor.command_count() == 1
+    assert page.element_cache.invalidations == 1
+
+    page.username.click()
+    assert executor.command_count(Command.FIND_ELEMENT) == 1
+
+
+def test_cached_script_reuses_result(page, executor):
+    calls = []
+    executor.script_handler = lambda script, args: calls.append(args) or args[0] * 2
+    assert page.cached_script('return arguments[0] * 2;', 21) == 42
+    assert page.cached_script('return arguments[0] * 2;', 21) == 42
+    assert calls == [[21]]
+    assert executor.command_count() == 2
+    assert page.script_cache.hits == 1
+
+    page.cached_script('return arguments[0] * 2;', 1)
+    assert calls == [[21], [1]]
+
+
+def test_cached_script_follows_dom_changes(page, executor):
+    calls = []
+    executor.script_handler = lambda script, args: calls.append(script) or 'v{0}'.format(len(calls) - 1)
+    executor.async_script_handler = lambda script, args: [True, True]
+    assert page.cached_script('return 1;') == 'v0'
+
+    # Changed while waiting, without any command which may change the document
+    executor.document_version = 1
+    page.wait_until(wait.presence_of_element_located((By.ID, 'username')))
+    assert page.cached_script('return 1;') == 'v1'
+    assert page.cached_script('return 1;') == 'v1'
+    assert len(calls) == 2
+    assert page.script_cache.invalidations == 1
+
+
+def test_cached_script_evicts_least_recently_used(page, executor):
+    calls = []
+    executor.script_handler = lambda script, args: calls.append(args[0]) or args[0]
+    page.script_cache.max_size = 2
+    page.cached_script('return arguments[0];', 1)
+    page.cached_script('return arguments[0];', 2)
+    page.cached_script('return arguments[0];', 1)
+    page.cached_script('return arguments[0];', 3)
+    assert page.script_cache.evictions == 1
+
+    page.cached_script('return arguments[0];', 1)
+    page.cached_script('return arguments[0];', 2)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_navigate_invalidates_script_cache(page, executor):
+    calls = []
+    executor.script_handler = lambda script, args: calls.append(script)
+    page.cached_script('return 1;')
+    page.navigate()
+    page.cached_script('return 1;')
+    assert len(calls) == 2
@@ -0,0 +1,60 @@
+import json
+import time
+import zipfile
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects.driver import CommandTracker, DriverManager
+from friendly.pageobjects.recorder import SessionRecorder
+from friendly.pageobjects.settings import LayeredSettings
+
+
+def wait_for(predicate, timeout=5):
+    end = time.time() + timeout
+    while not predicate():
+        assert time.time() < end
+        time.sleep(0.01)
+
+
+def test_identical_frames_are_dropped(driver, executor, tmpdir):
+    tracker = CommandTracker.for_driver(driver)
+    recorder = SessionRecorder(driver, str(tmpdir.join('session.zip')), interval=0.01).start()
+
+    wait_for(lambda: recorder.duplicates >= 2)
+    executor.screenshot = 'next frame'
+    wait_for(lambda: recorder.frames == 2)
+    path = recorder.stop()
+
+    archive = zipfile.ZipFile(path)
+    index = json.loads(archive.read('index.json'))
+    assert [f['file'] for f in index['frames']] == ['frame-00000.png', 'frame-00001.png']
+    assert archive.read('frame-00001.png') == 'next frame'
+    assert tracker.commands[Command.SCREENSHOT] == 0
+    assert 0 < recorder.overhead < 1
+
+
+def test_interval_adapts_to_capture_time(driver, tmpdir):
+    recorder = SessionRecorder(driver, str(tmpdir.join('session.zip')), interval=1.0, max_overhead=0.1)
+    recorder._adapt(0.5)
+    assert recorder.current_interval == 5.0
+    recorder._adapt(2.0)
+    assert recorder.current_interval == recorder.max_interval
+    for _ in range(50):
+        recorder._adapt(0.01)
+    assert recorder.current_interval == 1.0
+
+
+def test_recording_enabled_by_settings(driver, tmpdir, monkeypatch):
+    path = tmpdir.join('settings.yaml')
+    path.write('selenium:\n'
+               '  recording:\n'
+               '    enabled: true\n'
+               '    path: {0}\n'
+               '    interval: 0.5\n'.format(tmpdir.join('recordings')))
+    manager = DriverManager(settings=LayeredSettings.from_profiles(str(path), profiles=[], local=False))
+    monkeypatch.setattr(manager, '_create_driver', lambda: driver)
+
+    manager.get_driver()
+    try:
+        assert manager.recorder is not None
+        assert manager.recorder.interval == 0.5
+    finally:
+        assert manager.stop_recording().startswith(str(tmpdir.join('recordings')))
@@ -0,0 +1,58 @@
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects.page import PageObject
+from friendly.pageobjects.product import Product, ProductInstance
+from friendly.pageobjects.routing import Router
+
+router = Router()
+
+
+@router.route('/')
+class HomePage(PageObject):
+    pass
+
+
+@router.route('/products/{id}')
+class ProductPage(PageObject):
+    pass
+
+
+@router.route('/products/{id}/reviews/{review}')
+class ReviewPage(PageObject):
+    pass
+
+
+@router.route('/products/new')
+class NewProductPage(PageObject):
+    pass
+
+
+@router.route('/{category}/{id}')
+class CategoryPage(PageObject):
+    pass
+
+
+class Shop(Product):
+    router = router
+
+    def visit(self):
+        pass
+
+
+def test_patterns_are_matched():
+    assert router.match('http://shop.local/') == (HomePage, {})
+    assert router.match('http://shop.local/products/new?ref=home') == (NewProductPage, {})
+    assert router.match('/products/42/') == (ProductPage, {'id': '42'})
+    assert router.match('/products/42/reviews/7') == (ReviewPage, {'id': '42', 'review': '7'})
+    assert router.match('/books/42') == (CategoryPage, {'category': 'books', 'id': '42'})
+    assert router.match('/products/42/edit') is None
+
+
+def test_current_page_reads_url_once(driver_manager, executor):
+    shop = Shop(driver_manager, ProductInstance('Instance1', 'http://shop.local'))
+    executor.url = 'http://shop.local/products/42'
+
+    page = shop.current_page()
+    assert isinstance(page, ProductPage)
+    assert page.route_params == {'id': '42'}
+    assert page.product is shop
+    assert executor.command_count() == executor.command_count(Command.GET_CURRENT_URL) == 1
@@ -0,0 +1,53 @@
+import os
+import json
+import base64
+import pytest
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects import screenshots
+from friendly.pageobjects.page import PageObject
+from friendly.pageobjects.screenshots import ScreenshotStore
+from friendly.pageobjects.worker import BackgroundWorker
+
+
+@pytest.fixture
+def store(tmpdir, monkeypatch):
+    store = ScreenshotStore(str(tmpdir.join('shots')))
+    monkeypatch.setattr(screenshots, 'get_screenshot_store', lambda: store)
+    return store
+
+
+def index(store):
+    with open(os.path.join(store.directory, store.index_filename)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_identical_screenshots_are_stored_once(store):
+    first = store.save_png('frame', test='a')
+    second = store.save_base64(base64.b64encode('frame'), test='b')
+    other = store.save_png('other frame')
+
+    assert first.wait() == second.wait()
+    assert other.wait() != first.wait()
+    assert len([f for f in os.listdir(store.directory) if f.endswith('.png')]) == 2
+    assert [e['test'] for e in index(store)[:2]] == ['a', 'b']
+
+
+def test_take_screenshot_only_blocks_for_capture(driver, executor, store):
+    executor.url = 'http://example.com/'
+    task = PageObject(driver).take_screenshot(step='login')
+    assert executor.command_count() == 1
+    assert executor.commands[0][0] == Command.SCREENSHOT
+
+    store.flush()
+    assert task.done()
+    assert index(store)[0]['step'] == 'login'
+    assert index(store)[0]['page'] == 'PageObject'
+
+
+def test_worker_reports_errors():
+    def fail():
+        raise ValueError('broken')
+
+    task = BackgroundWorker('test').submit(fail)
+    with pytest.raises(ValueError):
+        task.wait(1)
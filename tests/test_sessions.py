@@ -0,0 +1,115 @@
+import time
+import pytest
+from friendly.pageobjects import scripts, sessions
+from friendly.pageobjects.product import Product, ProductInstance
+from friendly.pageobjects.sessions import SessionStore
+
+
+class Shop(Product):
+    logins = 0
+
+    def login(self, username, password):
+        Shop.logins += 1
+        self.driver.add_cookie({'name': 'session', 'value': username, 'domain': 'shop.local'})
+
+    def visit(self):
+        pass
+
+
+@pytest.fixture
+def store(tmpdir, monkeypatch):
+    store = SessionStore(str(tmpdir.join('sessions')), ttl=60)
+    monkeypatch.setattr(sessions, 'get_session_store', lambda: store)
+    monkeypatch.setattr(Shop, 'logins', 0)
+    return store
+
+
+def test_states_are_shared_through_files(store):
+    store.save('Instance1-jondoe', {'cookies': []})
+    assert SessionStore(store.directory).get('Instance1-jondoe')['cookies'] == []
+
+    store.save('Instance1-expired', {'cookies': []}, ttl=-1)
+    assert SessionStore(store.directory).get('Instance1-expired') is None
+    store.save('Instance1-now', {'cookies': []}, ttl=0)
+    assert store.get('Instance1-now') is None
+
+
+def test_session_is_restored_instead_of_logging_in(driver_manager, executor, store):
+    local_storage = {'localStorage': {'flags': 'beta'}}
+    written = []
+
+    def script_handler(script, args):
+        if script == scripts.READ_STORAGE:
+            return local_storage
+        if script == scripts.WRITE_STATE:
+            written.append(args)
+
+    executor.script_handler = script_handler
+    instance = ProductInstance('Instance1', 'http://shop.local', {'username': 'jondoe', 'password': 'secret'})
+    shop = Shop(driver_manager, instance)
+
+    assert not shop.ensure_logged_in()
+    assert Shop.logins == 1
+
+    executor.cookies = []
+    assert shop.ensure_logged_in()
+    assert Shop.logins == 1
+    assert written == [[local_storage, [{'name': 'session', 'value': 'jondoe', 'domain': 'shop.local'}]]]
+    assert executor.url == 'http://shop.local'
+
+
+def test_invalid_session_logs_in_again(driver_manager, store):
+    instance = ProductInstance('Instance1', 'http://shop.local', {'username': 'jondoe'})
+    shop = Shop(driver_manager, instance)
+    shop.ensure_logged_in()
+
+    shop.is_logged_in = lambda: False
+    assert not shop.ensure_logged_in()
+    assert Shop.logins == 2
+
+
+def test_session_expires_with_cookies(driver_manager, executor, store):
+    executor.cookies = [{'name': 'remember', 'value': '1', 'expiry': int(time.time()) + 10}]
+    instance = ProductInstance('Instance1', 'http://shop.local', {'username': 'jondoe'})
+    Shop(driver_manager, instance).ensure_logged_in()
+    state = store.get('Instance1-jondoe')
+    assert state['expires'] - state['created'] <= 10
+
+
+def test_session_expires_with_session_cookies_only(driver_manager, executor, store, monkeypatch):
+    monkeypatch.setattr(Shop, 'session_cookies', ('remember',))
+    executor.cookies = [{'name': 'remember', 'value': '1', 'expiry': int(time.time()) + 50},
+                        {'name': 'analytics', 'value': '1', 'expiry': int(time.time()) + 10}]
+    instance = ProductInstance('Instance1', 'http://shop.local', {'username': 'jondoe'})
+    Shop(driver_manager, instance).ensure_logged_in()
+    state = store.get('Instance1-jondoe')
+    assert 10 < state['expires'] - state['created'] <= 50
+
+
+def test_state_is_restored_with_one_script(driver_manager, executor, store):
+    state = {'localStorage': {'consent': 'yes'}, 'sessionStorage': {'cart': '[1, 2]'}}
+    written = []
+
+    def script_handler(script, args):
+        if script == scripts.READ_STORAGE:
+            assert args[0] == ['localStorage', 'sessionStorage']
+            return state
+        if script == scripts.WRITE_STATE:
+            written.append(args)
+            return ['tracking']
+
+    executor.script_handler = script_handler
+    executor.cookies = [{'name': 'consent', 'value': '1'}, {'name': 'sid', 'value': 'x', 'httpOnly': True},
+                        {'name': 'tracking', 'value': '2', 'domain': '.example.com'}]
+    shop = Shop(driver_manager, ProductInstance('Instance1', 'http://shop.local'))
+
+    assert not shop.restore_state('cart')
+    shop.save_state('cart')
+
+    executor.cookies = []
+    executor.commands = []
+    assert shop.restore_state('cart')
+    assert written == [[state, [{'name': 'consent', 'value': '1'},
+                                {'name': 'tracking', 'value': '2', 'domain': '.example.com'}]]]
+    assert [c['name'] for c in executor.cookies] == ['sid', 'tracking']
+    assert executor.command_count() == 4
@@ -0,0 +1,161 @@
+import os
+import sys
+import subprocess
+import pytest
+from friendly.pageobjects import settings as settings_module
+from friendly.pageobjects.settings import LayeredSettings
+
+
+@pytest.fixture
+def base(tmpdir):
+    path = tmpdir.join('base.yaml')
+    path.write('selenium:\n  remote_url: http://base\n  reusebrowser: false\nproduct:\n  class: Base\n')
+    tmpdir.join('base.ci.yaml').write('selenium:\n  remote_url: http://ci\n')
+    return path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    calls = []
+    load = settings_module.yaml.safe_load
+
+    def counting_load(f, *args, **kwargs):
+        calls.append(f.name)
+        return load(f, *args, **kwargs)
+
+    monkeypatch.setattr(settings_module.yaml, 'safe_load', counting_load)
+    settings_module._layer_cache.clear()
+    return calls
+
+
+def test_layer_precedence(base, parses):
+    s = LayeredSettings.from_profiles(str(base), profiles=['ci'])
+    assert s['selenium.remote_url'] == 'http://ci'
+    assert s['selenium.reusebrowser'] is False
+    assert s['product.class'] == 'Base'
+    assert s.get('not.existing', 'default') == 'default'
+
+
+def test_explain(base, parses):
+    s = LayeredSettings.from_profiles(str(base), profiles=['ci'])
+    assert s.explain('selenium.remote_url') == [('base.ci.yaml', 'http://ci'), ('base.yaml', 'http://base')]
+    assert s.explain('product.class') == [('base.yaml', 'Base')]
+    assert s.explain('not.existing') == []
+
+
+def test_local_and_environment(base, parses, monkeypatch):
+    base.dirpath().join('base.local.yaml').write('product:\n  class: Local\n')
+    monkeypatch.setenv('SELENIUM_REMOTE_URL', 'http://env')
+    s = LayeredSettings.from_profiles(str(base), profiles=['ci'])
+    assert s['product.class'] == 'Local'
+    assert s.explain('selenium.remote_url')[0] == ('environment', 'http://env')
+
+
+def test_missing_profile(base, parses):
+    s = LayeredSettings.from_profiles(str(base), profiles=['nope'])
+    with pytest.raises(IOError):
+        s['product.class']
+
+
+def test_lazy_and_independent_reload(base, parses):
+    s = LayeredSettings.from_profiles(str(base), profiles=['ci'])
+    assert parses == []
+
+    assert s['selenium.remote_url'] == 'http://ci'
+    assert len(parses) == 1
+
+    s['product.class']
+    assert len(parses) == 2
+
+    overlay = base.dirpath().join('base.ci.yaml')
+    overlay.write('selenium:\n  remote_url: http://ci2\n')
+    st = os.stat(str(overlay))
+    os.utime(str(overlay), (st.st_atime, st.st_mtime + 10))
+
+    assert s.reload() == ['base.ci.yaml']
+    assert s['selenium.remote_url'] == 'http://ci2'
+    assert s['product.class'] == 'Base'
+    assert [os.path.basename(p) for p in parses] == ['base.ci.yaml', 'base.yaml', 'base.ci.yaml']
+
+    # Another stack over the same files reuses the parsed layers
+    LayeredSettings.from_profiles(str(base), profiles=['ci'])['product.class']
+    assert len(parses) == 3
+
+
+@pytest.fixture
+def anchored(tmpdir, parses):
+    path = tmpdir.join('anchored.yaml')
+    path.write('product: &prod\n'
+               '  class: pages.Product\n'
+               'instances:\n'
+               '  - instance: &instance1\n'
+               '      id: Instance1\n'
+               '      product: *prod\n'
+               '      url: http://instance1.local\n'
+               '  - instance: &instance2\n'
+               '      id: Instance2\n'
+               '      product: *prod\n'
+               '      url: http://instance2.local\n'
+               '  - instance: *instance1\n'
+               'browsers:\n'
+               '  - browser:\n'
+               '      name: FIREFOX\n'
+               '      remote: false\n'
+               '  - browser:\n'
+               '      name: FIREFOX\n'
+               '      remote: true\n')
+    return LayeredSettings.from_profiles(str(path), profiles=[])
+
+
+def test_collection_index(anchored):
+    instances = anchored.collection('instances')
+    assert instances['Instance2']['url'] == 'http://instance2.local'
+    assert 'Instance1' in instances
+    assert 'Instance3' not in instances
+    with pytest.raises(KeyError):
+        instances['Instance3']
+
+
+def test_collection_is_compact(anchored):
+    instances = anchored.collection('instances')
+    assert len(instances) == 2
+    assert instances['Instance1']['product'] is instances['Instance2']['product']
+    assert anchored.collection('instances') is instances
+
+
+def test_collection_filter(anchored):
+    browsers = anchored.collection('browsers')
+    assert browsers['FIREFOX']['remote'] is False
+    assert browsers.filter(name='FIREFOX', remote=True) == [{'name': 'FIREFOX', 'remote': True}]
+
+
+def test_collection_requires_list(anchored):
+    with pytest.raises(TypeError):
+        anchored.collection('product.class')
+
+
+def test_overlay_unsets_null_keys(tmpdir, parses):
+    path = tmpdir.join('base.yaml')
+    path.write('selenium:\n  browser:\n    name: CHROME\n    executable_path: /usr/local/bin/chromedriver\n')
+    tmpdir.join('base.firefox.yaml').write('selenium:\n  browser:\n    name: FIREFOX\n    executable_path: ~\n')
+    s = LayeredSettings.from_profiles(str(path), profiles=['firefox'])
+    assert s['selenium.browser.name'] == 'FIREFOX'
+    assert 'selenium.browser.executable_path' not in s
+    assert s.get('selenium.browser.executable_path', 'default') == 'default'
+
+
+def test_modules_import_without_settings_file(tmpdir):
+    package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    modules = ['page', 'product', 'component', 'pytest_plugin']
+    env = dict(os.environ, PYTHONPATH=package)
+    env.pop('USE_SETTINGS', None)
+    subprocess.check_call([sys.executable, '-c', ';'.join('import friendly.pageobjects.' + m for m in modules)],
+                          cwd=str(tmpdir), env=env)
+
+
+def test_lazy_creates_once():
+    created = []
+    get = settings_module.lazy(lambda: created.append(object()) or created[-1])
+    assert created == []
+    assert get() is get() is created[0]
+    assert len(created) == 1
@@ -0,0 +1,121 @@
+import pytest
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects import timing, wait
+from friendly.pageobjects.page import PageObject
+from friendly.pageobjects.timing import TimingRecorder
+
+
+def sample(start, load, requests=10):
+    return {'start': start, 'ttfb': 50, 'dom_content_loaded': 300, 'load': load,
+            'first_paint': 200, 'first_contentful_paint': 250, 'requests': requests}
+
+
+class HomePage(PageObject):
+    def get_page_load_condition(self):
+        return [wait.document_ready(), wait.title_is('Home')]
+
+
+class LegacyPage(HomePage):
+    collect_timing = True
+
+    def get_page_load_condition(self):
+        return lambda driver: True
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = TimingRecorder()
+    monkeypatch.setattr(timing, 'get_timing_recorder', lambda: recorder)
+    return recorder
+
+
+def test_rolling_percentiles(tmpdir):
+    path = str(tmpdir.join('timing.jsonl'))
+    recorder = TimingRecorder(path)
+    recorder.window = 10
+    for i in range(20):
+        recorder.record('HomePage', 'Instance1', sample(i, 1000 + i * 10))
+
+    assert len(recorder.samples('HomePage', 'Instance1')) == 10
+    assert recorder.percentiles('HomePage', 'Instance1')[0.5] == 1140
+    assert recorder.samples('HomePage') == []
+
+    reloaded = TimingRecorder(path)
+    assert reloaded.percentiles('HomePage', 'Instance1', 'requests')[0.99] == 10
+    assert len(reloaded.samples('HomePage', 'Instance1')) == 20
+
+
+def test_same_navigation_is_recorded_once():
+    recorder = TimingRecorder()
+    assert recorder.record('HomePage', None, sample(1, 1000)) is not None
+    assert recorder.record('HomePage', None, sample(1, 1000)) is None
+    assert len(recorder.samples('HomePage')) == 1
+
+
+def test_visit_collects_timing_along_with_wait(driver, executor, recorder):
+    executor.async_script_handler = lambda script, args: [True, [True, ['document-1', sample(1, 1200)]]]
+
+    page = HomePage(driver).visit(navigate=False)
+    assert page.timing['load'] == 1200
+    assert recorder.samples('HomePage')[0]['load'] == 1200
+    assert executor.command_count(Command.EXECUTE_SCRIPT, Command.EXECUTE_ASYNC_SCRIPT) == 1
+
+
+def test_visit_collects_timing_separately(driver, executor, recorder):
+    executor.script_handler = lambda script, args: sample(1, 900)
+
+    page = LegacyPage(driver).visit(navigate=False)
+    assert page.timing['load'] == 900
+    assert executor.command_count(Command.EXECUTE_SCRIPT) == 1
+
+
+def test_visit_skips_separate_timing_by_default(driver, executor, recorder):
+    executor.script_handler = lambda script, args: sample(1, 900)
+
+    class Page(LegacyPage):
+        collect_timing = None
+
+    assert Page(driver).visit(navigate=False).timing is None
+    assert executor.command_count(Command.EXECUTE_SCRIPT) == 0
+
+
+def test_timing_failure_does_not_fail_visit(driver, executor, recorder):
+    def refuse(script, args):
+        raise WebDriverException('scripts disabled')
+
+    executor.script_handler = refuse
+    assert LegacyPage(driver).visit(navigate=False).timing is None
+    assert recorder.samples('LegacyPage') == []
+
+
+class BudgetedPage(HomePage):
+    load_budget_ms = 1000
+    max_request_count = 20
+
+
+def test_check_budgets_uses_median_of_window():
+    samples = [sample(i, load) for i, load in enumerate([900, 2000, 950, 1050])]
+    assert timing.check_budgets('Page', None, samples, {'load': 1000}, tolerance=0.1, window=3) == []
+
+    violations = timing.check_budgets('Page', None, samples, {'load': 1000, 'requests': 5}, window=3)
+    assert [(v.metric, v.observed) for v in violations] == [('load', 1050), ('requests', 10)]
+
+
+def test_visit_fails_on_exceeded_budget(driver, executor, recorder):
+    executor.async_script_handler = lambda script, args: [True, [True, ['document-1', sample(1, 1500)]]]
+
+    with pytest.raises(timing.PerformanceBudgetExceeded) as e:
+        BudgetedPage(driver).visit(navigate=False)
+    assert [v.metric for v in e.value.violations] == ['load']
+    assert 'loadEventEnd' in executor.commands[-1][1]['script']
+
+
+def test_visit_soft_fails(driver, executor, recorder, monkeypatch):
+    monkeypatch.setattr(timing, 'soft_failures', [])
+    monkeypatch.setattr(BudgetedPage, 'budget_mode', 'soft')
+    executor.async_script_handler = lambda script, args: [True, [True, ['document-1', sample(1, 900, requests=30)]]]
+
+    with pytest.warns(timing.PerformanceBudgetWarning):
+        BudgetedPage(driver).visit(navigate=False)
+    assert [v.metric for v in timing.soft_failures] == ['requests']
@@ -0,0 +1,112 @@
+import os
+import pytest
+from io import BytesIO
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from friendly.pageobjects import visual
+from friendly.pageobjects.page import PageObject
+from friendly.pageobjects.visual import ReferenceScreenshots, VisualMismatch
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def png(size=(200, 100), color=(255, 255, 255), boxes=()):
+    image = Image.new('RGB', size, color)
+    for box, fill in boxes:
+        image.paste(fill, box)
+    data = BytesIO()
+    image.save(data, 'PNG')
+    return data.getvalue()
+
+
+@pytest.fixture
+def references(tmpdir, monkeypatch):
+    references = ReferenceScreenshots(str(tmpdir.join('references')))
+    monkeypatch.setattr(visual, 'get_references', lambda: references)
+    return references
+
+
+def test_missing_reference_is_created(references):
+    result = references.compare('page', png())
+    assert result.created and result.matches
+    assert references.has_reference('page')
+
+
+def test_unchanged_screenshot_matches_without_decoding_reference(references):
+    references.compare('page', png())
+    os.remove(os.path.join(references.directory, 'page.png'))
+
+    result = references.compare('page', png())
+    assert result.matches
+    assert result.changed_tiles == []
+
+
+def test_changed_tile_is_reported(references):
+    references.compare('page', png())
+    result = references.compare('page', png(boxes=[((70, 10, 80, 20), (0, 0, 0))]))
+
+    assert not result.matches
+    assert result.changed_tiles == [(64, 0, 128, 64)]
+    assert result.changed_pixels == 100
+    assert os.path.exists(result.diff_path)
+
+
+def test_ignored_regions_are_not_compared(references):
+    references.compare('page', png(), ignore=[(60, 0, 90, 30)])
+    result = references.compare('page', png(boxes=[((70, 10, 80, 20), (0, 0, 0))]), ignore=[(60, 0, 90, 30)])
+    assert result.matches
+
+
+def test_element_boxes():
+    info = {'scroll_x': 0, 'scroll_y': 100, 'width': 200, 'height': 50, 'ratio': 2,
+            'rects': [[10, 5, 20, 10], None]}
+    assert visual.element_boxes(info, (400, 100)) == [(20, 10, 60, 30), None]
+    assert visual.element_boxes(info, (400, 400)) == [(20, 210, 60, 230), None]
+
+
+def test_page_compares_with_reference(driver, executor, references):
+    class Dashboard(PageObject):
+        reference_ignore_regions = [(By.ID, 'clock')]
+
+    def script_handler(script, args):
+        return {'scroll_x': 0, 'scroll_y': 0, 'width': 200, 'height': 100, 'ratio': 1,
+                'rects': [[0, 0, 50, 20]]}
+
+    executor.script_handler = script_handler
+    executor.screenshot = png(boxes=[((0, 0, 50, 20), (0, 0, 255))])
+    assert Dashboard(driver).compare_with_reference().created
+
+    executor.screenshot = png(boxes=[((0, 0, 50, 20), (255, 0, 0))])
+    assert Dashboard(driver).compare_with_reference().matches
+    assert executor.command_count(Command.SCREENSHOT) == 2
+
+    executor.screenshot = png(boxes=[((100, 50, 110, 60), (255, 0, 0))])
+    with pytest.raises(VisualMismatch):
+        Dashboard(driver).compare_with_reference()
+
+
+def test_elements_are_cropped_from_one_screenshot(driver, executor, tmpdir, monkeypatch):
+    from friendly.pageobjects import screenshots
+    store = screenshots.ScreenshotStore(str(tmpdir.join('shots')))
+    monkeypatch.setattr(screenshots, 'get_screenshot_store', lambda: store)
+
+    rects = {'logo': [0, 0, 50, 20], 'icon': [100, 50, 10, 10]}
+
+    def script_handler(script, args):
+        return {'scroll_x': 0, 'scroll_y': 0, 'width': 200, 'height': 100, 'ratio': 1,
+                'rects': [rects.get(value) for by, value in args[0]]}
+
+    executor.script_handler = script_handler
+    executor.screenshot = png(boxes=[((0, 0, 50, 20), (0, 0, 255))])
+    page = PageObject(driver)
+    locators = {'logo': (By.ID, 'logo'), 'icon': (By.ID, 'icon'), 'missing': (By.ID, 'missing')}
+
+    images = page.capture_elements(locators).wait(5)
+    assert Image.open(BytesIO(images['logo'])).size == (50, 20)
+    assert Image.open(BytesIO(images['icon'])).getpixel((0, 0)) == (255, 255, 255)
+    assert images['missing'] is None
+    assert executor.command_count() == 2
+
+    paths = page.capture_elements(locators, store=True, step='header').wait(5)
+    assert os.path.exists(paths['logo'])
+    assert paths['missing'] is None
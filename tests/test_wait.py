@@ -0,0 +1,187 @@
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.support import expected_conditions as EC
+from friendly.pageobjects import wait
+from friendly.pageobjects.wait import BrowserWait, ScriptCondition
+
+
+@pytest.fixture(autouse=True)
+def stats():
+    wait.wait_stats.clear()
+    return wait.wait_stats
+
+
+def test_script_condition_waits_in_browser(driver, executor, stats):
+    executor.async_script_handler = lambda script, args: [True, 'done']
+
+    condition = wait.presence_of_element_located((By.ID, 'spinner'))
+    assert BrowserWait(driver, 5).until(condition) == 'done'
+    assert BrowserWait(driver, 5).until(condition) == 'done'
+
+    assert executor.command_count(Command.SET_SCRIPT_TIMEOUT) == 1
+    assert executor.command_count(Command.EXECUTE_ASYNC_SCRIPT) == 2
+    script, args = executor.commands[-1][1]['script'], executor.commands[-1][1]['args']
+    assert 'MutationObserver' in script
+    assert args[0] == ['id', 'spinner']
+    assert stats['browser']['waits'] == 2
+    assert stats['browser']['commands'] == 3
+
+
+def test_expected_condition_waits_in_browser(driver, executor, stats):
+    executor.async_script_handler = lambda script, args: [True, True]
+    assert BrowserWait(driver, 5).until(EC.title_is('Home')) is True
+    assert executor.command_count(Command.EXECUTE_ASYNC_SCRIPT) == 1
+    assert executor.commands[-1][1]['args'][0] == ['Home']
+    assert stats['client']['waits'] == 0
+
+
+def test_in_browser_timeout(driver, executor):
+    executor.async_script_handler = lambda script, args: [False, None]
+    with pytest.raises(TimeoutException):
+        BrowserWait(driver, 0.05).until(ScriptCondition('return false;'))
+
+
+def test_falls_back_to_polling(driver, executor, stats):
+    def unsupported(script, args):
+        raise WebDriverException('async scripts not supported')
+
+    executor.async_script_handler = unsupported
+    executor.script_handler = lambda script, args: True
+
+    assert BrowserWait(driver, 1).until(wait.document_ready()) is True
+    assert executor.command_count(Command.EXECUTE_SCRIPT) == 1
+
+
+def test_other_conditions_are_polled(driver, executor, stats):
+    polls = []
+
+    def condition(d):
+        polls.append(d)
+        return len(polls) == 2
+
+    assert BrowserWait(driver, 1, poll_frequency=0.01).until(condition) is True
+    assert stats['client']['commands'] == 2
+    assert executor.command_count(Command.EXECUTE_ASYNC_SCRIPT) == 0
+
+
+def test_all_of_compiles_to_one_script(driver, executor):
+    executor.async_script_handler = lambda script, args: [True, True]
+    condition = wait.all_of(wait.document_ready(),
+                            EC.invisibility_of_element_located((By.ID, 'spinner')),
+                            EC.presence_of_element_located((By.ID, 'content')))
+    assert isinstance(condition, ScriptCondition)
+    assert condition.args == [[], ['id', 'spinner'], ['id', 'content']]
+
+    BrowserWait(driver, 1).until(condition)
+    assert executor.command_count(Command.EXECUTE_ASYNC_SCRIPT) == 1
+
+
+def test_composite_falls_back_for_unsupported(driver, executor):
+    calls = []
+    executor.script_handler = lambda script, args: calls.append(args) or True
+    unsupported = EC.alert_is_present()
+
+    condition = wait.all_of(EC.title_is('Home'), EC.title_contains('Ho'), lambda d: 'python')
+    assert isinstance(condition, wait.CompositeCondition)
+    assert condition(driver) == 'python'
+    assert calls == [[[['Home'], ['Ho']]]]
+
+    executor.script_handler = lambda script, args: False
+    assert wait.any_of(EC.title_is('Home'), lambda d: 'python')(driver) == 'python'
+    assert wait.all_of(EC.title_is('Home'), unsupported)(driver) is False
+    assert executor.command_count(Command.GET_ALERT_TEXT) == 0
+
+
+def test_describe():
+    assert wait.describe(EC.presence_of_element_located((By.ID, 'content'))) == \
+        'presence_of_element_located(id=content)'
+    assert wait.describe(wait.presence_of_element_located((By.ID, 'content'))) == \
+        'presence_of_element_located(id=content)'
+    assert wait.describe(wait.all_of(wait.document_ready(), EC.title_is('Home'))) == \
+        "all_of(document_ready(), title_is('Home'))"
+
+
+def test_history_suggests_timeouts(tmpdir):
+    history = wait.WaitHistory(str(tmpdir.join('history.json')))
+    assert history.suggest_timeout('Page', 'cond', 10) == 10
+
+    for i in range(100):
+        history.record('Page', 'cond', 0.5 + i / 100.0)
+    history.record('Page', 'cond', 10, timed_out=True)
+    assert history.suggest_timeout('Page', 'cond', 10) == pytest.approx(2 * 1.48)
+
+    history.save()
+    reloaded = wait.WaitHistory(str(tmpdir.join('history.json')))
+    assert reloaded.report()[0]['count'] == 101
+    assert reloaded.report()[0]['timeouts'] == 1
+
+
+def test_parallel_histories_are_merged(tmpdir):
+    path = str(tmpdir.join('history.json'))
+    first, second = wait.WaitHistory(path), wait.WaitHistory(path)
+    first.record('Page', 'cond', 1.0)
+    second.record('Page', 'cond', 2.0)
+    second.record('Page', 'other', 3.0, timed_out=True)
+    first.save()
+    second.save()
+    first.save()
+
+    entry = wait.WaitHistory(path)._conditions['Page|cond']
+    assert entry['count'] == 2
+    assert sorted(entry['samples']) == [1.0, 2.0]
+    assert second.report()[0]['condition'] == 'other'
+
+
+def test_poll_schedule_backs_off():
+    history = wait.WaitHistory()
+    schedule = history.poll_schedule('Page', 'cond')
+    intervals = [next(schedule) for _ in range(8)]
+    assert intervals[0] == history.initial_poll
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == history.max_poll
+
+    for i in range(50):
+        history.record('Page', 'cond', 2.0)
+    assert next(history.poll_schedule('Page', 'cond')) == pytest.approx(1.6)
+
+
+def test_report_orders_by_total():
+    history = wait.WaitHistory()
+    history.record('Home', 'fast', 0.1)
+    history.record('Home', 'slow', 3)
+    history.record('Detail', 'fast', 0.2)
+    assert [(r['page'], r['condition']) for r in history.report(2)] == [('Home', 'slow'), ('Detail', 'fast')]
+    assert 'Home: slow' in history.format_report()
+
+
+def test_page_records_waits(driver, executor, monkeypatch):
+    from friendly.pageobjects.page import PageObject
+    history = wait.WaitHistory()
+    monkeypatch.setattr(wait, 'get_wait_history', lambda: history)
+    executor.async_script_handler = lambda script, args: [True, True]
+
+    PageObject(driver).wait_until(wait.document_ready())
+    assert history.report()[0]['page'] == 'PageObject'
+    assert history.report()[0]['condition'] == 'document_ready()'
+
+
+def test_anonymous_conditions_are_not_recorded(driver, executor, monkeypatch):
+    from friendly.pageobjects.page import PageObject
+    history = wait.WaitHistory()
+    monkeypatch.setattr(wait, 'get_wait_history', lambda: history)
+    executor.script_handler = lambda script, args: True
+    page = PageObject(driver)
+
+    assert wait.describe(lambda d: True) is None
+    assert wait.describe(wait.all_of(EC.title_is('Home'), lambda d: True)) is None
+    page.wait_until(lambda d: True)
+    page.wait_until(wait.all_of(EC.title_is('Home'), lambda d: True))
+    assert history.report() == []
+
+    with pytest.raises(TimeoutException):
+        page.wait_until(lambda d: False, timeout=0)
+
+    page.wait_until(lambda d: True, name='dialog closed')
+    assert history.report()[0]['condition'] == 'dialog closed'